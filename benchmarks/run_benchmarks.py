@@ -0,0 +1,414 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+End to end benchmarks of the list, show and branch paths, of importing the
+package and a tracker, and of the memory held by parsed issues.
+
+Trackers talk to an in-process HTTP server serving synthetic issues, so
+results only depend on issue2branch (and its dependencies) and can be
+compared across releases. Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --sizes 10 1000 100000 -o out.json
+
+Every case runs `--repeat` times, and the best time is kept.
+'''
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from six import StringIO
+from six.moves import BaseHTTPServer, socketserver  # pylint: disable=import-error
+from six.moves.urllib.parse import urlparse, parse_qs  # pylint: disable=import-error
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT_DIR)
+
+# pylint: disable=wrong-import-position
+from issue2branch.config import Config
+from issue2branch.issue import Issue, IssueTree
+from issue2branch.output import TextWriter
+from issue2branch.repo import GitRepository, get_branch_names
+from issue2branch.trackers.bitbucket import Bitbucket
+from issue2branch.trackers.github import Github
+from issue2branch.trackers.redmine import Redmine
+from issue2branch.utils.requests import create_session
+
+
+_DEFAULT_SIZES = [10, 100, 1000, 10000]
+_DEFAULT_REPEAT = 3
+# Creating branches is slow, and does not depend on the issue list size
+_MAX_BRANCHES = 200
+
+_STATUSES = ['New', 'In Progress', 'Resolved', 'Closed']
+_PRIORITIES = ['Low', 'Normal', 'High', 'Urgent']
+_TAGS = ['Bug', 'Feature', 'Documentation']
+
+# Issues held in memory by the issues_memory case, like a full sync
+_MEMORY_ISSUES = 50000
+_IMPORTS = [
+    ('import_package', 'issue2branch'),
+    ('import_tracker', 'issue2branch.trackers.redmine'),
+]
+
+
+def _title(number):
+    return "Synthetic issue número {}: fix the {} when {}".format(
+        number, ['parser', 'renderer', 'cache'][number % 3],
+        ['listing', 'branching', 'syncing'][number % 7 % 3])
+
+
+def github_issue(number):
+    return {
+        'number': number,
+        'title': _title(number),
+        'body': "Description of issue {}\n\nWith several lines".format(number),
+        'assignee': {'login': 'user{}'.format(number % 5)},
+        'labels': [{'name': _TAGS[number % 3].lower()},
+                   {'name': 'priority:{}'.format(_PRIORITIES[number % 4])}],
+        'state': 'open',
+    }
+
+
+def redmine_issue(number):
+    issue = {
+        'id': number,
+        'subject': _title(number),
+        'description': "Description of issue {}".format(number),
+        'tracker': {'id': 1, 'name': _TAGS[number % 3]},
+        'status': {'id': 1, 'name': _STATUSES[number % 4]},
+        'priority': {'id': 1, 'name': _PRIORITIES[number % 4]},
+        'assigned_to': {'id': 1, 'name': 'User {}'.format(number % 5)},
+        'project': {'id': 1, 'name': 'Project {}'.format(number % 3)},
+    }
+    if number % 4 == 0 and number > 1:  # Some subtasks
+        issue['parent'] = {'id': number // 2}
+    return issue
+
+
+def bitbucket_issue(number):
+    return {
+        'local_id': number,
+        'title': _title(number),
+        'content': "Description of issue {}".format(number),
+    }
+
+
+class FakeTrackerHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    ''' Serves `server.size` synthetic issues for every tracker API. '''
+    _ROUTES = [
+        (re.compile(r'^/github/repos/[^/]+/[^/]+/issues$'), '_github_list'),
+        (re.compile(r'^/github/repos/[^/]+/[^/]+/issues/(\d+)$'),
+         '_github_issue'),
+        (re.compile(r'^/redmine/issues\.json$'), '_redmine_list'),
+        (re.compile(r'^/redmine/issues/(\d+)\.json$'), '_redmine_issue'),
+        (re.compile(r'^/bitbucket/repositories/[^/]+/[^/]+/issues$'),
+         '_bitbucket_list'),
+        (re.compile(r'^/bitbucket/repositories/[^/]+/[^/]+/issues/(\d+)$'),
+         '_bitbucket_issue'),
+    ]
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes, which Nagle's algorithm would
+    # delay on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        for regexp, method in self._ROUTES:
+            mobj = regexp.match(url.path)
+            if mobj:
+                getattr(self, method)(query, *[int(g) for g in mobj.groups()])
+                return
+        self._send({'message': 'Not found'}, status=404)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def _send(self, content, status=200, headers=None):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _github_list(self, query):
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        size = self.server.size
+        start = (page - 1) * per_page
+        numbers = range(size - start, max(size - start - per_page, 0), -1)
+        last_page = max((size + per_page - 1) // per_page, 1)
+        base = "http://{}:{}{}?per_page={}&page=".format(
+            self.server.server_address[0], self.server.server_address[1],
+            urlparse(self.path).path, per_page)
+        links = ['<{}{}>; rel="last"'.format(base, last_page)]
+        if page < last_page:
+            links.append('<{}{}>; rel="next"'.format(base, page + 1))
+        self._send([github_issue(n) for n in numbers],
+                   headers={'Link': ", ".join(links)})
+
+    def _github_issue(self, dummy_query, number):
+        self._send(github_issue(number))
+
+    def _redmine_list(self, query):
+        limit = int(query.get('limit', 25))
+        offset = int(query.get('offset', 0))
+        size = self.server.size
+        numbers = range(offset + 1, min(offset + limit, size) + 1)
+        self._send({'issues': [redmine_issue(n) for n in numbers],
+                    'total_count': size, 'offset': offset, 'limit': limit})
+
+    def _redmine_issue(self, dummy_query, number):
+        self._send({'issue': redmine_issue(number)})
+
+    def _bitbucket_list(self, query):
+        limit = int(query.get('limit', 15))
+        numbers = range(1, min(limit, self.server.size) + 1)
+        self._send({'count': self.server.size,
+                    'issues': [bitbucket_issue(n) for n in numbers]})
+
+    def _bitbucket_issue(self, dummy_query, number):
+        self._send(bitbucket_issue(number))
+
+
+class FakeTrackerServer(socketserver.ThreadingMixIn,
+                        BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    size = 0
+
+    @property
+    def url(self):
+        return "http://{}:{}".format(*self.server_address[:2])
+
+
+def _local_api(tracker_class, base_url):
+    ''' A tracker class whose API lives under `base_url`. '''
+    class LocalTracker(tracker_class):  # pylint: disable=abstract-method
+        @staticmethod
+        def _api_url(path):
+            return "{}/{}".format(base_url, path)
+    LocalTracker.__name__ = tracker_class.__name__
+    return LocalTracker
+
+
+def create_trackers(server_url):
+    kwargs = {'session': create_session(), 'workers': 4}
+    return {
+        'github': _local_api(Github, server_url + '/github')(
+            'user', 'repo', **kwargs),
+        'redmine': Redmine(server_url + '/redmine', **kwargs),
+        'bitbucket': _local_api(Bitbucket, server_url + '/bitbucket')(
+            'user', 'repo', **kwargs),
+    }
+
+
+def _import_time(module):
+    ''' Seconds to import `module` in a fresh interpreter. '''
+    code = ("import time\nstart = time.time()\nimport {}\n"
+            "print(time.time() - start)".format(module))
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=_ROOT_DIR)
+    return float(output.decode('utf-8'))
+
+
+def _issues_memory(size):
+    '''
+    Bytes allocated by `size` parsed issues, linked in a tree, or None without
+    tracemalloc (python < 3.4).
+    '''
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    titles = [_title(number) for number in range(size)]
+    tracemalloc.start()
+    try:
+        tree = IssueTree()
+        tree.extend(Issue(number, titles[number], tag=_TAGS[number % 3],
+                          parent=number // 10 if number % 10 else None,
+                          priority=_PRIORITIES[number % 4],
+                          status=_STATUSES[number % 4])
+                    for number in range(size))
+        current, dummy_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del tree
+    return current
+
+
+def _best_time(func, repeat, setup=None):
+    times = []
+    for dummy in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+class Benchmarks(object):
+    def __init__(self, server, repeat, workdir):
+        self._server = server
+        self._repeat = repeat
+        self._workdir = workdir
+        self._trackers = create_trackers(server.url)
+        self._config = Config.from_sections({
+            'index': {'path': os.path.join(workdir, 'index.sqlite')},
+        })
+        self.results = []
+
+    def _record(self, tracker_name, case, size, seconds):
+        print("{:10} {:15} {:>7} {:10.4f}s".format(tracker_name, case, size,
+                                                   seconds))
+        self.results.append({'tracker': tracker_name, 'case': case,
+                             'size': size, 'seconds': seconds,
+                             'repeat': self._repeat})
+
+    @staticmethod
+    def _options(tracker, size):
+        return tracker.get_arg_parser().parse_args(
+            ['--list', '--limit', str(size)])
+
+    def _record_memory(self, case, size, nbytes):
+        print("{:10} {:15} {:>7} {:>10}B".format('-', case, size, nbytes))
+        self.results.append({'tracker': '-', 'case': case, 'size': size,
+                             'bytes': nbytes})
+
+    def run(self, sizes):
+        for case, module in _IMPORTS:
+            self._record('-', case, 1,
+                         min(_import_time(module)
+                             for dummy in range(self._repeat)))
+        nbytes = _issues_memory(_MEMORY_ISSUES)
+        if nbytes is not None:
+            self._record_memory('issues_memory', _MEMORY_ISSUES, nbytes)
+        for size in sizes:
+            self._server.size = size
+            for name in sorted(self._trackers):
+                self._run_tracker(name, self._trackers[name], size)
+
+    def _run_tracker(self, name, tracker, size):
+        options = self._options(tracker, size)
+        config = self._config
+
+        fetched = []
+
+        def fetch():
+            fetched[:] = tracker.get_issue_list(config, options)
+        self._record(name, 'list_fetch', size, _best_time(fetch, self._repeat))
+        issues = list(fetched)
+
+        def build_tree():
+            tree = IssueTree()
+            tree.extend(issues)
+        self._record(name, 'tree_build', size,
+                     _best_time(build_tree, self._repeat))
+
+        def render():
+            writer = TextWriter(stream=StringIO())
+            tracker._write_issues(issues, writer)  # pylint: disable=protected-access
+        self._record(name, 'render', size, _best_time(render, self._repeat))
+
+        def list_end_to_end():
+            stdout = sys.stdout
+            sys.stdout = StringIO()
+            try:
+                tracker._list(config, options)  # pylint: disable=protected-access
+            finally:
+                sys.stdout = stdout
+        self._record(name, 'list', size,
+                     _best_time(list_end_to_end, self._repeat))
+
+        def show():
+            tracker.get_issue(1, config, options)
+        self._record(name, 'show', size, _best_time(show, self._repeat))
+
+        def branch_names():
+            get_branch_names(issues)
+        self._record(name, 'branch_names', size,
+                     _best_time(branch_names, self._repeat))
+
+        branched = issues[:_MAX_BRANCHES]
+        names = get_branch_names(branched)
+        repository = []
+
+        def new_repository():
+            import git
+            path = tempfile.mkdtemp(dir=self._workdir)
+            repo = git.Repo.init(path)
+            repo.index.commit("Initial commit")
+            del repository[:]
+            repository.append(GitRepository(path))
+
+        def branch_and_move():
+            for branch in names:
+                repository[0].branch_and_move(branch)
+        self._record(name, 'branch_and_move', len(branched),
+                     _best_time(branch_and_move, self._repeat,
+                                setup=new_repository))
+
+
+def _metadata():
+    import issue2branch
+    try:
+        import pkg_resources
+        version = pkg_resources.get_distribution('issue2branch').version
+    except Exception:  # pylint: disable=broad-except
+        version = None
+    return {
+        'version': version,
+        'package_path': os.path.dirname(issue2branch.__file__),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=_DEFAULT_SIZES,
+                        help="Amounts of issues served by the fake trackers")
+    parser.add_argument('--repeat', type=int, default=_DEFAULT_REPEAT,
+                        help="Runs per case. The best one is kept")
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help="JSON file for the results")
+    options = parser.parse_args()
+
+    server = FakeTrackerServer(('127.0.0.1', 0), FakeTrackerHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    workdir = tempfile.mkdtemp()
+    try:
+        benchmarks = Benchmarks(server, options.repeat, workdir)
+        benchmarks.run(options.sizes)
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir)
+
+    with open(options.output, 'w') as fobj:
+        json.dump({'metadata': _metadata(), 'results': benchmarks.results},
+                  fobj, indent=2, sort_keys=True)
+    print("Results saved to '{}'".format(options.output))
+
+
+if __name__ == '__main__':
+    main()
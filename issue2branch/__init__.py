@@ -1,9 +1,16 @@
 from __future__ import absolute_import, unicode_literals, division
 
+import time
+_STARTED = time.time()  # Before the imports below, which --timings includes
+
+# pylint: disable=wrong-import-position
 import os
 import logging
+import sys
 
+from . import timings
 from .config import get_config
+from .repo import get_repository
 from .trackers import get_issue_tracker
 
 
@@ -14,8 +21,38 @@ def main():
         if level not in ['INFO', 'DEBUG', 'WARNING', 'WARN', 'CRITICAL']:
             level = 'INFO'
         logging.basicConfig(level=level)
-    config = get_config()
-    get_issue_tracker(config).run(config)
+    from . import tracing
+    enabled, timings_file = timings.get_timing_options(sys.argv[1:])
+    if enabled:
+        recorded = timings.enable(started=_STARTED)
+    trace_output = tracing.get_trace_output(sys.argv[1:])
+    if trace_output is not None:
+        trace = tracing.enable(started=_STARTED)
+    if enabled or trace_output is not None:
+        timings.record(timings.IMPORTS, _STARTED, time.time() - _STARTED)
+        timings.time_git_commands()
+    from .profiling import get_profile_options, profiled
+    mode, output = get_profile_options(sys.argv[1:])
+    try:
+        if mode is None:
+            _run()
+        else:
+            with profiled(mode, output):
+                _run()
+    finally:
+        if enabled:
+            timings.report(recorded, timings_file)
+        if trace_output is not None:
+            tracing.save(trace, trace_output)
+
+
+def _run():
+    repository = get_repository()
+    with timings.timed(timings.CONFIG):
+        config = get_config(repository)
+    with timings.timed(timings.TRACKER):
+        tracker = get_issue_tracker(config, repository)
+    tracker.run(config, repository)
 
 
 if __name__ == "__main__":
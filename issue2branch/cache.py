@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+On-disk cache for issue tracker contents.
+'''
+from __future__ import absolute_import, unicode_literals, division
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+_DEFAULT_TTL = 300
+_DEFAULT_MAX_ENTRIES = 500
+_ENTRY_SUFFIX = '.json'
+
+
+def get_cache_dir():
+    base_dir = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base_dir, 'issue2branch')
+
+
+class CacheMiss(Exception):
+    def __init__(self, key):
+        super(CacheMiss, self).__init__(
+            "No cached content for '{}' (running --offline)".format(key))
+
+
+class IssueCache(object):
+    '''
+    Stores decoded tracker contents in a directory, one file per key.
+
+    Entries older than `ttl` seconds are considered stale. When the amount of
+    entries goes over `max_entries`, the least recently used ones are
+    evicted. Entry files are touched on every hit, so their mtime tracks
+    their last use.
+    '''
+    def __init__(self, path, ttl=_DEFAULT_TTL, max_entries=_DEFAULT_MAX_ENTRIES,
+                 clock=time.time):
+        self._path = path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._clock = clock
+
+    @property
+    def path(self):
+        return self._path
+
+    @classmethod
+    def from_config(cls, config):
+        ''' Build a cache from the `[cache]` section. None if disabled. '''
+        ttl = config.get('cache', 'ttl', _DEFAULT_TTL, coerce=int)
+        if ttl <= 0:
+            return None
+        max_entries = config.get('cache', 'max_entries', _DEFAULT_MAX_ENTRIES,
+                                 coerce=int)
+        path = config.get('cache', 'path', None) or get_cache_dir()
+        return cls(os.path.expanduser(path), ttl=ttl, max_entries=max_entries)
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self._path, digest + _ENTRY_SUFFIX)
+
+    def _read_entry(self, key):
+        fname = self._entry_path(key)
+        try:
+            with open(fname) as fobj:
+                entry = json.load(fobj)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        try:
+            os.utime(fname, None)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return self._clock() - entry['stored'] < self._ttl
+
+    def get_entry(self, key):
+        '''
+        The whole cache entry for `key`, fresh or not, or None if missing.
+
+        Entries are dicts holding the `content`, the `validators` (ETag,
+        Last-Modified) it was served with and its paging `links`.
+        '''
+        entry = self._read_entry(key)
+        if entry is None:
+            logger.debug("Cache miss: '%s'", key)
+        return entry
+
+    def get(self, key, ignore_ttl=False):
+        ''' Cached content for `key`, or None if missing or stale. '''
+        entry = self.get_entry(key)
+        if entry is None:
+            return None
+        if not ignore_ttl and not self.is_fresh(entry):
+            logger.debug("Cache stale: '%s'", key)
+            return None
+        logger.debug("Cache hit: '%s'", key)
+        return entry['content']
+
+    def set(self, key, content, validators=None, links=None):
+        entry = {
+            'key': key,
+            'stored': self._clock(),
+            'content': content,
+            'validators': validators or {},
+            'links': links or {},
+        }
+        self._store(entry)
+
+    def revalidate(self, entry):
+        ''' Mark an entry as fresh again, e.g. after a 304 response. '''
+        entry = dict(entry, stored=self._clock())
+        self._store(entry)
+        return entry
+
+    def _store(self, entry):
+        key = entry['key']
+        try:
+            data = json.dumps(entry)
+        except (TypeError, ValueError):
+            logger.debug("Content for '%s' is not cacheable", key)
+            return
+        self._write(self._entry_path(key), data)
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _write(self, fname, data):
+        try:
+            if not os.path.isdir(self._path):
+                os.makedirs(self._path)
+            fdesc, tmp_name = tempfile.mkstemp(dir=self._path,
+                                               suffix='.tmp')
+            with os.fdopen(fdesc, 'w') as fobj:
+                fobj.write(data)
+            os.rename(tmp_name, fname)
+        except (IOError, OSError) as err:
+            logger.warning("Could not write cache entry '%s': %s", fname, err)
+
+    def _evict(self):
+        try:
+            fnames = [os.path.join(self._path, f)
+                      for f in os.listdir(self._path)
+                      if f.endswith(_ENTRY_SUFFIX)]
+        except OSError:
+            return
+        excess = len(fnames) - self._max_entries
+        if excess <= 0:
+            return
+        by_use = sorted(fnames, key=_mtime_or_zero)
+        for fname in by_use[:excess]:
+            logger.debug("Evicting cache entry: '%s'", fname)
+            try:
+                os.remove(fname)
+            except OSError:
+                pass
+
+
+def _mtime_or_zero(fname):
+    try:
+        return os.path.getmtime(fname)
+    except OSError:
+        return 0
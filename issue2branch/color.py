@@ -33,6 +33,14 @@ RESET = _color_code(39)
 BRIGHT = _color_code(1)
 RESET_ALL = _color_code(0)
 
+# Escape sequence starting each color, by name
+CODES = {
+    'black': BLACK, 'red': RED, 'green': GREEN, 'yellow': YELLOW,
+    'blue': BLUE, 'magenta': MAGENTA, 'cyan': CYAN, 'white': WHITE,
+}
+CODES.update([('bright_' + name, code + BRIGHT)
+              for name, code in list(CODES.items())])
+
 
 def _color_func(color):
     def func(string):
@@ -6,17 +6,29 @@ Created on May 17, 2014
 from __future__ import (absolute_import, unicode_literals, division,
                         print_function)
 
+import hashlib
+import json
+import logging
 import os
+import sys
+import tempfile
 from six.moves.configparser import (  # pylint: disable=import-error
     SafeConfigParser, NoSectionError, NoOptionError
 )
 
+from .cache import get_cache_dir
 from .repo import get_git_root
 
 
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
 
 CONF_FILE = '.issue2branch.config'
 CONF_ENV_VARIABLE = 'ISSUE2BRANCH_CONFIG'
+SYSTEM_CONF_FILE = '/etc/issue2branch.config'
+USER_CONF_FILE = 'config'
+# Options never written to the compiled config cache
+SECRET_OPTIONS = [('auth', 'password')]
 
 
 class ConfigMissing(Exception):
@@ -32,11 +44,21 @@ class Config(object):
 
     @classmethod
     def from_filename(cls, fname):
-        print("Loading issue2branch config from: '{}'".format(fname))
+        print("Loading issue2branch config from: '{}'".format(fname),
+              file=sys.stderr)
         config = SafeConfigParser()
         config.read([fname])
         return cls(config)
 
+    @classmethod
+    def from_filenames(cls, fnames):
+        ''' Merge several files. Later ones override earlier ones. '''
+        config = SafeConfigParser()
+        for fname in config.read(fnames):
+            print("Loading issue2branch config from: '{}'".format(fname),
+                  file=sys.stderr)
+        return cls(config)
+
     @classmethod
     def from_sections(cls, sections):
         config = SafeConfigParser()
@@ -47,6 +69,11 @@ class Config(object):
         return cls(config)
 
 
+    def to_sections(self):
+        ''' The raw values of every section, for `from_sections`. '''
+        return {section: dict(self._config.items(section, raw=True))
+                for section in self._config.sections()}
+
     def get(self, section, option, default, coerce=None):  # pylint: disable=redefined-builtin
         try:
             value = self._config.get(section, option)
@@ -60,6 +87,13 @@ class Config(object):
                     section, option, coerce))
         return value
 
+    def items(self, section):
+        ''' The options in `section` as a dict, empty if it is missing. '''
+        try:
+            return dict(self._config.items(section))
+        except NoSectionError:
+            return {}
+
     def get_or_die(self, section, option, default=None, **kwargs):
         value = self.get(section, option, default, **kwargs)
         if value is not None:
@@ -67,13 +101,122 @@ class Config(object):
         raise ConfigMissing(section, option)
 
 
-def get_config_file():
+def get_config_file(repository=None):
     try:
         return os.environ[CONF_ENV_VARIABLE]
     except KeyError:
-        git_root = get_git_root()
+        git_root = (get_git_root() if repository is None
+                    else repository.working_dir)
         return os.path.join(git_root, CONF_FILE)
 
 
-def get_config():
-    return Config.from_filename(get_config_file())
+def get_user_config_file():
+    base_dir = (os.environ.get('XDG_CONFIG_HOME') or
+                os.path.join(os.path.expanduser('~'), '.config'))
+    return os.path.join(base_dir, 'issue2branch', USER_CONF_FILE)
+
+
+def get_config_files(repository=None):
+    '''
+    The config files to merge, from lowest to highest precedence: system,
+    user, repository root and `ISSUE2BRANCH_CONFIG`. Some may not exist.
+    '''
+    return _get_config_files(repository)[0]
+
+
+def _get_config_files(repository=None):
+    ''' `get_config_files`, and whether the repository root was found. '''
+    fnames = [SYSTEM_CONF_FILE, get_user_config_file()]
+    try:
+        git_root = (get_git_root() if repository is None
+                    else repository.working_dir)
+    except ValueError:  # Not in a repository. Fine, if configured elsewhere
+        logger.debug("Not in a git repository, skipping repository config")
+        in_repository = False
+    else:
+        fnames.append(os.path.join(git_root, CONF_FILE))
+        in_repository = True
+    if os.environ.get(CONF_ENV_VARIABLE):
+        fnames.append(os.environ[CONF_ENV_VARIABLE])
+    return fnames, in_repository
+
+
+def _mtime_or_none(fname):
+    try:
+        return os.path.getmtime(fname)
+    except OSError:
+        return None
+
+
+def _get_compiled_config_file(repository=None):
+    ''' Compiled configs depend on the working directory and environment. '''
+    key = "\0".join([
+        os.path.abspath(repository.path if repository is not None else "."),
+        os.environ.get(CONF_ENV_VARIABLE, ""),
+        os.environ.get('XDG_CONFIG_HOME', ""),
+    ])
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir(), 'config', digest + '.json')
+
+
+def _load_compiled_config(fname):
+    try:
+        with open(fname) as fobj:
+            compiled = json.load(fobj)
+    except (IOError, OSError, ValueError):
+        return None
+    if any(_mtime_or_none(f) != mtime
+           for f, mtime in compiled['mtimes'].items()):
+        logger.debug("Config files changed, reloading them")
+        return None
+    return compiled['sections']
+
+
+def _has_secrets(config):
+    return any(config.get(section, option, None) is not None
+               for section, option in SECRET_OPTIONS)
+
+
+def _store_compiled_config(fname, fnames, config):
+    compiled = {
+        # Missing files too (as None), so creating one invalidates the cache
+        'mtimes': {f: _mtime_or_none(f) for f in fnames},
+        'sections': config.to_sections(),
+    }
+    try:
+        directory = os.path.dirname(fname)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fdesc, tmp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fdesc, 'w') as fobj:
+            json.dump(compiled, fobj)
+        os.rename(tmp_name, fname)
+    except (IOError, OSError) as err:
+        logger.warning("Could not store compiled config '%s': %s", fname, err)
+
+
+def get_config(repository=None):
+    '''
+    Merge the config files (see `get_config_files`).
+
+    The merged config is compiled to the cache dir and reused while none of
+    the files changes (nor appears), skipping both INI parsing and looking
+    for the repository root.
+
+    It is not compiled outside a repository, as the repository root config
+    could appear anywhere once there is one, nor when it holds secrets
+    (see `SECRET_OPTIONS`), which do not belong in a cache.
+    '''
+    compiled_fname = _get_compiled_config_file(repository)
+    sections = _load_compiled_config(compiled_fname)
+    if sections is not None:
+        return Config.from_sections(sections)
+    fnames, in_repository = _get_config_files(repository)
+    config = Config.from_filenames(fnames)
+    if not in_repository:
+        logger.debug("Not compiling the config outside a repository")
+    elif _has_secrets(config):
+        logger.debug("Not compiling a config with secrets")
+    else:
+        _store_compiled_config(compiled_fname, fnames, config)
+    return config
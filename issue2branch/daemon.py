@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Background daemon that keeps an issue list warm and serves it over a Unix
+socket, so every run on the machine shares a single stream of API calls.
+'''
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+
+from .cache import get_cache_dir
+from .issue import Issue
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+_DEFAULT_INTERVAL = 60
+_DEFAULT_MAX_BACKOFF = 900
+_DEFAULT_TIMEOUT = 5
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def get_socket_path(config, scope):
+    ''' The daemon socket for a tracker `scope`, under the cache dir. '''
+    path = config.get('daemon', 'socket', None)
+    if path:
+        return os.path.expanduser(path)
+    digest = hashlib.sha1(scope.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), 'daemon-{}.sock'.format(digest))
+
+
+def _poll_options(options):
+    ''' Options that revalidate cached lists on every poll. '''
+    return argparse.Namespace(**dict(vars(options), refresh=True,
+                                     offline=False))
+
+
+class IssueDaemon(object):
+    '''
+    Polls `tracker`'s issue list every `interval` seconds and answers
+    `get_issue` / `get_issue_list` requests from `DaemonClient`s.
+
+    Polls are conditional requests when the tracker has a cache, so an
+    unchanged list costs a 304. Failed polls back off exponentially, up to
+    `max_backoff` seconds.
+    '''
+    def __init__(self, tracker, config, options, path,
+                 interval=_DEFAULT_INTERVAL, max_backoff=_DEFAULT_MAX_BACKOFF):
+        self._tracker = tracker
+        self._config = config
+        self._options = options
+        self._path = path
+        self._interval = interval
+        self._max_backoff = max_backoff
+        self._list_key = _list_key(tracker, config, options)
+        self._issues = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+        self.ready = threading.Event()
+
+    @classmethod
+    def from_config(cls, tracker, config, options):
+        return cls(
+            tracker, config, options,
+            path=get_socket_path(config, tracker.scope),
+            interval=config.get('daemon', 'interval', _DEFAULT_INTERVAL,
+                                coerce=int),
+            max_backoff=config.get('daemon', 'max_backoff',
+                                   _DEFAULT_MAX_BACKOFF, coerce=int),
+        )
+
+    @property
+    def path(self):
+        return self._path
+
+    def poll(self):
+        ''' Fetch the issue list once, replacing the served one. '''
+        issues = []
+        for page in self._tracker.iter_issue_pages(
+                self._config, _poll_options(self._options)):
+            issues.extend(issue.to_dict() for issue in page)
+        with self._lock:
+            self._issues = issues
+        logger.debug("Polled %s issues", len(issues))
+
+    def _poll_forever(self):
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+                failures = 0
+                wait = self._interval
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Could not poll the issue list")
+                failures += 1
+                wait = min(self._interval * 2 ** failures, self._max_backoff)
+            self._stopped.wait(wait)
+
+    def handle(self, message):
+        ''' Answer a decoded request message. '''
+        if message.get('scope') != self._tracker.scope:
+            return {'error': 'Not serving scope: {}'.format(
+                message.get('scope'))}
+        method = message.get('method')
+        if method == 'get_issue_list':
+            if message.get('list') != self._list_key:
+                return {'error': 'Not serving this list'}
+            with self._lock:
+                issues = self._issues
+            if issues is None:
+                return {'error': 'Issue list not fetched yet'}
+            return {'issues': issues}
+        elif method == 'get_issue':
+            issue = self._tracker.get_issue(message['issue'], self._config,
+                                            self._options)
+            return {'issue': issue.to_dict()}
+        return {'error': 'Unknown method: {}'.format(method)}
+
+    def serve_forever(self):
+        ''' Poll and serve until interrupted. '''
+        _remove_stale_socket(self._path)
+        directory = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._server = _create_server(self._path, self)
+        self.ready.set()
+        poller = threading.Thread(target=self._poll_forever)
+        poller.daemon = True
+        poller.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.stop()
+
+    def shutdown(self):
+        ''' Make `serve_forever` return. Call from another thread. '''
+        if self._server is not None:
+            self._server.shutdown()
+
+    def stop(self):
+        self.ready.clear()
+        self._stopped.set()
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+
+def _create_server(path, daemon):
+    '''
+    A threaded Unix socket server answering with `daemon.handle`.
+
+    socketserver is only imported here, as clients do not need it.
+    '''
+    from six.moves import socketserver  # pylint: disable=import-error
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            try:
+                message = json.loads(self.rfile.readline().decode('utf-8'))
+                reply = daemon.handle(message)
+            except Exception as err:  # pylint: disable=broad-except
+                logger.exception("Could not handle request")
+                reply = {'error': str(err)}
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+
+    return Server(path, Handler)
+
+
+def _list_key(tracker, config, options):
+    ''' Identifies a list, so the daemon only serves the one it polls. '''
+    return [tracker.get_issue_list_url(config, options),
+            tracker.get_list_limit(config, options)]
+
+
+def _remove_stale_socket(path):
+    if not os.path.exists(path):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        os.remove(path)
+    else:
+        raise ValueError("A daemon is already serving at '{}'".format(path))
+    finally:
+        sock.close()
+
+
+class DaemonClient(object):
+    ''' Talks to an `IssueDaemon`. Raises `DaemonUnavailable` on failures. '''
+    def __init__(self, path, timeout=_DEFAULT_TIMEOUT):
+        self._path = path
+        self._timeout = timeout
+
+    @classmethod
+    def from_config(cls, config, scope):
+        ''' A client for `scope`'s daemon, or None if none is running. '''
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        path = get_socket_path(config, scope)
+        if not os.path.exists(path):
+            return None
+        return cls(path, timeout=config.get('daemon', 'timeout',
+                                            _DEFAULT_TIMEOUT, coerce=float))
+
+    def _send(self, message):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._path)
+            sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            reply = sock.makefile('rb').readline()
+        except (socket.error, socket.timeout) as err:
+            raise DaemonUnavailable(err)
+        finally:
+            sock.close()
+        try:
+            reply = json.loads(reply.decode('utf-8'))
+        except ValueError:
+            raise DaemonUnavailable("Invalid reply: {!r}".format(reply))
+        if 'error' in reply:
+            raise DaemonUnavailable(reply['error'])
+        return reply
+
+    def get_issue_list(self, tracker, config, options):
+        reply = self._send({
+            'method': 'get_issue_list',
+            'scope': tracker.scope,
+            'list': _list_key(tracker, config, options),
+        })
+        return [Issue.from_dict(data) for data in reply['issues']]
+
+    def get_issue(self, tracker, issue):
+        reply = self._send({
+            'method': 'get_issue',
+            'scope': tracker.scope,
+            'issue': issue,
+        })
+        return Issue.from_dict(reply['issue'])
@@ -1,35 +1,107 @@
-from . import color
+from __future__ import absolute_import, unicode_literals
+
+import os
+import sys
+
+from .color import CODES, RESET_ALL
 
 _PRIORITY_COLORS = {
-    'immediate': color.bright_red,
-    'urgent': color.red,
-    'high': color.bright_yellow,
-    'normal': color.bright_blue,
-    'medium': color.bright_blue,
-    'low': color.green,
+    'immediate': 'bright_red',
+    'urgent': 'red',
+    'high': 'bright_yellow',
+    'normal': 'bright_blue',
+    'medium': 'bright_blue',
+    'low': 'green',
 }
 
 _STATUS_COLORS = {
-    'new': color.bright_yellow,
-    'in progress': color.bright_cyan,
-    'resolved': color.green,
-    'closed': color.bright_green,
+    'new': 'bright_yellow',
+    'in progress': 'bright_cyan',
+    'resolved': 'green',
+    'closed': 'bright_green',
 }
 
 _TAG_COLORS = {
-    'issue': color.magenta,
-    'bug': color.bright_red,
-    'enhancement': color.bright_blue,
-    'documentation': color.yellow,
-    'new feature': color.green,
-    'feature': color.green,
+    'issue': 'magenta',
+    'bug': 'bright_red',
+    'enhancement': 'bright_blue',
+    'documentation': 'yellow',
+    'new feature': 'green',
+    'feature': 'green',
 }
 
+_COLOR_MODES = ('auto', 'always', 'never')
+
+
+def _build_table(overrides=None):
+    ''' Label to escape sequence, from lowest to highest precedence. '''
+    table = {}
+    for colors in [_TAG_COLORS, _STATUS_COLORS, _PRIORITY_COLORS,
+                   overrides or {}]:
+        for label, name in colors.items():
+            label = label.lower()
+            if name == 'none':
+                table.pop(label, None)
+                continue
+            try:
+                table[label] = CODES[name]
+            except KeyError:
+                raise ValueError("'{}' is not a valid color for '{}'".format(
+                    name, label))
+    return table
+
+
+# Labels are looked up as given, and lowercased on misses. Only labels with a
+# color are memoized, so unknown labels can not grow the table.
+_table = _build_table()  # pylint: disable=invalid-name
+_enabled = True  # pylint: disable=invalid-name
+
+
+def configure_colors(config, stream=None):
+    '''
+    Set up colors from the config's `[colors]` section and `[output] color`.
+
+    `[colors]` maps labels (priorities, statuses and tags) to color names,
+    like `bright_red`, or `none`. Colors are disabled with `[output] color =
+    never`, and in `auto` mode (the default) when `NO_COLOR` is set or
+    `stream` (stdout by default) is not a terminal.
+    '''
+    global _table, _enabled  # pylint: disable=global-statement,invalid-name
+    mode = config.get('output', 'color', 'auto')
+    if mode not in _COLOR_MODES:
+        raise ValueError("[output] color must be one of {}: '{}'".format(
+            ", ".join(_COLOR_MODES), mode))
+    _table = _build_table(config.items('colors'))
+    if mode == 'auto':
+        stream = stream or sys.stdout
+        isatty = getattr(stream, 'isatty', None)
+        _enabled = ('NO_COLOR' not in os.environ and
+                    isatty is not None and isatty())
+    else:
+        _enabled = mode == 'always'
+
+
+def _get_code(label):
+    try:
+        return _table[label]
+    except KeyError:
+        code = _table.get(label.lower())
+        if code is not None:
+            _table[label] = code
+        return code
+
+
 def colorize(text, label=None):
-    label = (label or text).lower()
-    for color_dict in [_PRIORITY_COLORS, _STATUS_COLORS, _TAG_COLORS]:
-        try:
-            return color_dict[label](text)
-        except KeyError:
-            continue
-    return text
+    if not _enabled:
+        return text
+    code = _get_code(label or text)
+    if code is None:
+        return text
+    return code + text + RESET_ALL
+
+
+def paint(text, name):
+    ''' Color `text` with a color name, unless colors are disabled. '''
+    if not _enabled:
+        return text
+    return CODES[name] + text + RESET_ALL
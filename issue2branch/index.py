@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Local full-text index of fetched issues.
+'''
+from __future__ import absolute_import, unicode_literals, division
+
+import json
+import logging
+import os
+import re
+import sqlite3
+
+from .cache import get_cache_dir
+from .issue import Issue
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+_INDEX_FILE = 'index.sqlite'
+_INDEXED_FIELDS = ('title', 'description', 'tag', 'status', 'assignee',
+                   'project')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS issues (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    issue_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    UNIQUE (scope, issue_id)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    scope TEXT PRIMARY KEY,
+    synced_at TEXT NOT NULL
+);
+'''
+_FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts4({});
+'''.format(", ".join(_INDEXED_FIELDS))
+
+
+class IssueIndex(object):
+    '''
+    SQLite backed index of issues, searchable by their text fields.
+
+    Issues are stored per tracker `scope` (see `IssueTracker.scope`) and
+    updated in place, so the index grows incrementally with every list.
+    '''
+    def __init__(self, path):
+        self._path = path
+        self._connection = None
+        self._failed = False
+
+    @classmethod
+    def from_config(cls, config):
+        path = (config.get('index', 'path', None) or
+                os.path.join(get_cache_dir(), _INDEX_FILE))
+        return cls(os.path.expanduser(path))
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            directory = os.path.dirname(self._path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._connection = sqlite3.connect(self._path)
+            with self._connection:
+                self._connection.executescript(_SCHEMA)
+                self._connection.execute(_FTS_SCHEMA)
+        return self._connection
+
+    def update(self, scope, issues):
+        ''' Add the issues to the index, replacing previous versions. '''
+        with self.connection as connection:
+            for issue in issues:
+                self._update_issue(connection, scope, issue)
+
+    def try_update(self, scope, issues):
+        '''
+        Like `update`, for when indexing is a side effect that must not fail.
+
+        Errors, like an unwritable or locked database, are logged once, and
+        later calls do nothing.
+        '''
+        if self._failed:
+            return
+        try:
+            self.update(scope, issues)
+        except (sqlite3.Error, IOError, OSError) as err:
+            logger.warning("Could not index issues in '%s': %s", self._path,
+                           err)
+            self._failed = True
+            self.close()
+
+    @staticmethod
+    def _update_issue(connection, scope, issue):
+        data = issue.to_dict()
+        texts = [data[field] for field in _INDEXED_FIELDS]
+        row = connection.execute(
+            "SELECT id FROM issues WHERE scope = ? AND issue_id = ?",
+            (scope, str(issue.issue_id))).fetchone()
+        if row is None:
+            cursor = connection.execute(
+                "INSERT INTO issues (scope, issue_id, data) VALUES (?, ?, ?)",
+                (scope, str(issue.issue_id), json.dumps(data)))
+            connection.execute(
+                "INSERT INTO issues_fts (docid, {}) VALUES (?, {})".format(
+                    ", ".join(_INDEXED_FIELDS),
+                    ", ".join("?" for _ in _INDEXED_FIELDS)),
+                [cursor.lastrowid] + texts)
+        else:
+            row_id, = row
+            connection.execute("UPDATE issues SET data = ? WHERE id = ?",
+                               (json.dumps(data), row_id))
+            connection.execute(
+                "UPDATE issues_fts SET {} WHERE docid = ?".format(
+                    ", ".join("{} = ?".format(f) for f in _INDEXED_FIELDS)),
+                texts + [row_id])
+
+    def search(self, scope, query, limit=None):
+        '''
+        Issues matching all the words in `query`, as word prefixes.
+
+        Issues added to the index last come first.
+        '''
+        words = _WORD_RE.findall(query.lower())
+        if not words:
+            return []
+        sql = ("SELECT issues.data FROM issues_fts "
+               "JOIN issues ON issues.id = issues_fts.docid "
+               "WHERE issues_fts MATCH ? AND issues.scope = ? "
+               "ORDER BY issues.id DESC")
+        params = [" ".join(word + "*" for word in words), scope]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [Issue.from_dict(json.loads(data))
+                for data, in self.connection.execute(sql, params)]
+
+    def get_last_sync(self, scope):
+        ''' Timestamp of the last `--sync` for `scope`, or None. '''
+        row = self.connection.execute(
+            "SELECT synced_at FROM syncs WHERE scope = ?", (scope,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_last_sync(self, scope, timestamp):
+        with self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO syncs (scope, synced_at) VALUES (?, ?)",
+                (scope, timestamp))
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM issues").fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,9 +1,52 @@
 from __future__ import absolute_import, unicode_literals, division
 
-from .format import colorize
-from .color import green, magenta
+import collections
+
+from .format import colorize, paint
+
+
+class _LeafChilds(dict):
+    '''
+    The empty `childs` of a leaf issue, which become the issue's own once
+    something is added to them, so `issue.childs[key] = child` keeps working.
+    '''
+    __slots__ = ('_issue',)
+
+    def __init__(self, issue):
+        super(_LeafChilds, self).__init__()
+        self._issue = issue
+
+    def _attach(self):
+        if self._issue is not None:
+            if self._issue._childs is None:  # pylint: disable=protected-access
+                self._issue._childs = self  # pylint: disable=protected-access
+            self._issue = None
+
+    def __setitem__(self, key, value):
+        self._attach()
+        super(_LeafChilds, self).__setitem__(key, value)
+
+    def setdefault(self, key, default=None):
+        self._attach()
+        return super(_LeafChilds, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._attach()
+        super(_LeafChilds, self).update(*args, **kwargs)
+
 
 class Issue(object):
+    '''
+    An issue, as parsed from a tracker.
+
+    Issues are slotted, and only allocate their `childs` dict when they get a
+    child (see `add_child`), as full syncs hold tens of thousands of them.
+    '''
+    FIELDS = ('issue_id', 'title', 'tag', 'parent', 'priority', 'status',
+              'assignee', 'project', 'description')
+    __slots__ = ('issue_id', 'title', '_tag', 'parent', '_childs', 'priority',
+                 'status', 'assignee', 'project', 'description')
+
     def __init__(self, issue_id, title, tag=None, parent=None, priority=None,
                  status=None, assignee=None, project=None, description=None):
         self.issue_id = issue_id
@@ -11,7 +54,7 @@ class Issue(object):
         self._tag = None
         self.tag = tag
         self.parent = parent
-        self.childs = {}
+        self._childs = None
         self.priority = priority
         self.status = status
         self.assignee = assignee
@@ -19,29 +62,46 @@ class Issue(object):
         self.description = description
 
     def text(self):
+        parts = ["{} -".format(self.issue_id)]
         if self.priority or self.status:
-            texts = [colorize(t.capitalize())
-                     for t in (self.priority, self.status, ) if t]
-            status = " [{}] -".format("/".join(texts))
-        else:
-            status = ""
-        tag = colorize(" {}: ".format(self.tag.capitalize()), self.tag)
-        if self.assignee:
-            assignee = green("({})".format(self.assignee))
-            assignee = " - {}".format(assignee)
-        else:
-            assignee = ""
+            parts.append(" [{}] -".format("/".join(
+                colorize(t.capitalize())
+                for t in (self.priority, self.status) if t)))
         if self.project:
-            project = magenta(" {{{}}}".format(self.project))
-        else:
-            project = ''
-
-        return "{} -{}{}{}{}{}".format(self.issue_id, status, project, tag,
-                                       self.title, assignee)
+            parts.append(paint(" {{{}}}".format(self.project), 'magenta'))
+        parts.append(colorize(" {}: ".format(self.tag.capitalize()),
+                              self.tag))
+        parts.append("{}".format(self.title))
+        if self.assignee:
+            parts.append(" - {}".format(
+                paint("({})".format(self.assignee), 'green')))
+        return "".join(parts)
 
     def branch(self):
         return "{}-{}-{}".format(self.tag, self.issue_id, self.title)
 
+    def to_dict(self):
+        ''' The issue's fields, without its childs. '''
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in cls.FIELDS})
+
+    @property
+    def childs(self):
+        '''
+        Child issues by id. Leaves get an empty dict, only kept if written to.
+        '''
+        if self._childs is None:
+            return _LeafChilds(self)
+        return self._childs
+
+    def add_child(self, child):
+        if self._childs is None:
+            self._childs = {}
+        self._childs[child.issue_id] = child
+
     @property
     def tag(self):
         return self._tag
@@ -49,3 +109,41 @@ class Issue(object):
     @tag.setter
     def tag(self, tag):
         self._tag = tag or "Issue"
+
+
+class IssueTree(object):
+    '''
+    Links issues to their parents as they are added.
+
+    Children may be added before their parents. Issues whose parent is not in
+    the tree are kept as roots.
+    '''
+    def __init__(self):
+        self._issues = {}
+        self._roots = {}
+        self._orphans = collections.defaultdict(list)
+
+    def add(self, issue):
+        issue_id = issue.issue_id
+        self._issues[issue_id] = issue
+        for child in self._orphans.pop(issue_id, []):
+            issue.add_child(child)
+            del self._roots[child.issue_id]
+        parent = issue.parent
+        if parent is not None and parent in self._issues:
+            self._issues[parent].add_child(issue)
+        else:
+            self._roots[issue_id] = issue
+            if parent is not None:
+                self._orphans[parent].append(issue)
+
+    def extend(self, issues):
+        for issue in issues:
+            self.add(issue)
+
+    @property
+    def roots(self):
+        return self._roots
+
+    def __len__(self):
+        return len(self._issues)
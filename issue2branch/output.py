@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Writers for issue lists, in human or machine readable formats, and the
+buffered (and possibly paged) output they write to.
+'''
+from __future__ import absolute_import, unicode_literals, division
+
+import json
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+
+from .issue import Issue
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+TEXT = 'text'
+FORMATS = (TEXT, 'json', 'jsonl', 'tsv')
+
+_BUFFER_SIZE = 64 * 1024
+_DEFAULT_PAGER = 'less -R'
+_DEFAULT_TERMINAL_HEIGHT = 24
+
+
+class IssueWriter(object):
+    '''
+    Writes issues to `stream` (stdout by default) one by one.
+
+    `many` is False when writing a single issue, e.g. for --show.
+    '''
+    def __init__(self, stream=None, many=True):
+        self._stream = stream or sys.stdout
+        self._many = many
+
+    def write(self, issue, depth=0):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TextWriter(IssueWriter):
+    ''' Colored, indented issue lines, for humans. '''
+    def write(self, issue, depth=0):
+        self._stream.write("{} * {}\n".format("  " * depth, issue.text()))
+
+
+class JsonWriter(IssueWriter):
+    '''
+    A JSON array of issues, or a single JSON object if not `many`.
+
+    The array is streamed as issues are written.
+    '''
+    def __init__(self, stream=None, many=True):
+        super(JsonWriter, self).__init__(stream, many=many)
+        self._count = 0
+
+    def write(self, issue, depth=0):
+        data = json.dumps(issue.to_dict(), sort_keys=True)
+        if not self._many:
+            self._stream.write(data + "\n")
+            return
+        self._stream.write(("[" if self._count == 0 else ",\n") + data)
+        self._count += 1
+
+    def close(self):
+        if self._many:
+            self._stream.write("[]\n" if self._count == 0 else "]\n")
+
+
+class JsonLinesWriter(IssueWriter):
+    ''' One JSON object per issue and line. '''
+    def write(self, issue, depth=0):
+        self._stream.write(json.dumps(issue.to_dict(), sort_keys=True) + "\n")
+
+
+class TsvWriter(IssueWriter):
+    '''
+    Tab separated values, with a header row of `Issue.FIELDS`.
+
+    Backslashes, tabs and newlines in values are escaped as `\\\\`, `\\t`
+    and `\\n`. Missing values are empty.
+    '''
+    def __init__(self, stream=None, many=True):
+        super(TsvWriter, self).__init__(stream, many=many)
+        self._stream.write("\t".join(Issue.FIELDS) + "\n")
+
+    def write(self, issue, depth=0):
+        data = issue.to_dict()
+        self._stream.write("\t".join(_tsv_escape(data[field])
+                                     for field in Issue.FIELDS) + "\n")
+
+
+_TSV_ESCAPES = [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')]
+
+
+def _tsv_escape(value):
+    if value is None:
+        return ""
+    value = "{}".format(value)
+    for char, escaped in _TSV_ESCAPES:
+        value = value.replace(char, escaped)
+    return value
+
+
+_WRITERS = {
+    TEXT: TextWriter,
+    'json': JsonWriter,
+    'jsonl': JsonLinesWriter,
+    'tsv': TsvWriter,
+}
+
+
+def get_issue_writer(fmt, stream=None, many=True):
+    try:
+        writer_class = _WRITERS[fmt]
+    except KeyError:
+        raise ValueError("'{}' is not a valid output format".format(fmt))
+    return writer_class(stream=stream, many=many)
+
+
+class BufferedOutput(object):
+    '''
+    Collects writes, and writes them to `stream` in a single call.
+
+    Buffered text is written when it goes over `buffer_size` characters, on
+    `flush()` (e.g. after each page of issues) and on `close()`.
+    '''
+    def __init__(self, stream=None, buffer_size=_BUFFER_SIZE):
+        self._stream = stream or sys.stdout
+        self._buffer_size = buffer_size
+        self._parts = []
+        self._size = 0
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_size:
+            self.flush()
+
+    def _pop_buffer(self):
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        return text
+
+    def flush(self):
+        if self._parts:
+            self._stream.write(self._pop_buffer())
+        self._stream.flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PagedOutput(BufferedOutput):
+    '''
+    Like `BufferedOutput`, but pipes everything through `pager` once the
+    output does not fit in `height` lines.
+
+    Until then, output is held back, so `flush()` only writes once the pager
+    is running.
+    '''
+    def __init__(self, stream, pager, height, buffer_size=_BUFFER_SIZE):
+        super(PagedOutput, self).__init__(stream, buffer_size=buffer_size)
+        self._pager = pager
+        self._height = height
+        self._lines = 0
+        self._process = None
+
+    def write(self, text):
+        if self._process is None:
+            self._lines += text.count("\n")
+            if self._lines >= self._height:
+                self._start_pager()
+        super(PagedOutput, self).write(text)
+
+    def _start_pager(self):
+        try:
+            self._process = subprocess.Popen(shlex.split(self._pager),
+                                             stdin=subprocess.PIPE)
+        except OSError as err:
+            logger.warning("Could not run pager '%s': %s", self._pager, err)
+            self._height = float('inf')
+            return
+        encoding = getattr(self._stream, 'encoding', None) or 'utf-8'
+        self._stream = _EncodingPipe(self._process.stdin, encoding)
+
+    def flush(self):
+        if self._process is None and self._lines < self._height:
+            return
+        try:
+            super(PagedOutput, self).flush()
+        except IOError:  # The pager was closed
+            self._parts = []
+            self._size = 0
+
+    def close(self):
+        if self._process is None:
+            self._lines = self._height  # Flush what fits on screen
+        self.flush()
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except IOError:
+                pass
+            self._process.wait()
+
+
+class _EncodingPipe(object):
+    def __init__(self, pipe, encoding):
+        self._pipe = pipe
+        self.encoding = encoding
+
+    def write(self, text):
+        self._pipe.write(text.encode(self.encoding, 'replace'))
+
+    def flush(self):
+        self._pipe.flush()
+
+
+def get_terminal_height(default=_DEFAULT_TERMINAL_HEIGHT):
+    get_terminal_size = getattr(shutil, 'get_terminal_size', None)
+    if get_terminal_size is not None:
+        return get_terminal_size((80, default)).lines
+    try:
+        return int(os.environ['LINES'])
+    except (KeyError, ValueError):
+        return default
+
+
+def open_output(config, fmt=TEXT, stream=None):
+    '''
+    A buffered output for `stream` (stdout by default).
+
+    Text output to a terminal is paged with the `[output] pager` command
+    (`less -R` by default, empty to disable) when it does not fit on screen.
+    '''
+    stream = stream or sys.stdout
+    pager = config.get('output', 'pager', _DEFAULT_PAGER)
+    isatty = getattr(stream, 'isatty', None)
+    if fmt == TEXT and pager and isatty is not None and isatty():
+        return PagedOutput(stream, pager, get_terminal_height())
+    return BufferedOutput(stream)
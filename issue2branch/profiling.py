@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Whole run profiling, enabled with `--profile` or `ISSUE2BRANCH_PROFILE`.
+'''
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+PROFILE_ENV_VARIABLE = 'ISSUE2BRANCH_PROFILE'
+PROFILE_OUTPUT_ENV_VARIABLE = 'ISSUE2BRANCH_PROFILE_OUTPUT'
+
+CPU = 'cpu'
+MEMORY = 'mem'
+MODES = (CPU, MEMORY)
+
+_DEFAULT_OUTPUTS = {
+    CPU: 'issue2branch.pstats',
+    MEMORY: 'issue2branch-mem.txt',
+}
+_TOP_ALLOCATIONS = 30
+_TRACEBACK_FRAMES = 10
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile",
+                        choices=MODES, default=None,
+                        help=("Profile the run's cpu usage (as .pstats) or "
+                              "memory allocations. Also set with "
+                              "${}".format(PROFILE_ENV_VARIABLE)))
+    parser.add_argument("--profile-output",
+                        default=None, metavar="PATH",
+                        help=("Where to write the --profile report. Also set "
+                              "with ${}".format(PROFILE_OUTPUT_ENV_VARIABLE)))
+
+
+def get_profile_options(args, environ=None):
+    '''
+    The profiling `(mode, output)` for a command line. Flags override the
+    environment. `mode` is None when not profiling.
+    '''
+    environ = os.environ if environ is None else environ
+    parser = argparse.ArgumentParser(add_help=False)
+    add_profile_arguments(parser)
+    options, dummy_args = parser.parse_known_args(args)
+    mode = options.profile or environ.get(PROFILE_ENV_VARIABLE) or None
+    if mode is not None and mode not in MODES:
+        raise ValueError("{} must be one of {}: '{}'".format(
+            PROFILE_ENV_VARIABLE, ", ".join(MODES), mode))
+    output = (options.profile_output or
+              environ.get(PROFILE_OUTPUT_ENV_VARIABLE) or
+              _DEFAULT_OUTPUTS.get(mode))
+    return mode, output
+
+
+@contextlib.contextmanager
+def profiled(mode, output):
+    ''' Profile the block with `mode`, writing the report to `output`. '''
+    if mode == CPU:
+        with _cpu_profiled(output):
+            yield
+    elif mode == MEMORY:
+        with _memory_profiled(output):
+            yield
+    else:
+        raise ValueError("'{}' is not a valid profile mode".format(mode))
+    print("Profile saved to '{}'".format(output), file=sys.stderr)
+
+
+@contextlib.contextmanager
+def _cpu_profiled(output):
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(output)
+
+
+@contextlib.contextmanager
+def _memory_profiled(output):
+    try:
+        import tracemalloc
+    except ImportError:
+        raise ValueError("Memory profiling needs python 3.4+ (tracemalloc)")
+    tracemalloc.start(_TRACEBACK_FRAMES)
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        _write_memory_report(output, snapshot, current, peak)
+
+
+def _write_memory_report(output, snapshot, current, peak):
+    snapshot = snapshot.filter_traces(_ignored_traces())
+    stats = snapshot.statistics('traceback')
+    with io.open(output, 'w', encoding='utf-8') as fobj:
+        fobj.write("Current: {:.1f} KiB, peak: {:.1f} KiB\n".format(
+            current / 1024, peak / 1024))
+        fobj.write("Top {} allocations by size:\n".format(_TOP_ALLOCATIONS))
+        for index, stat in enumerate(stats[:_TOP_ALLOCATIONS], 1):
+            fobj.write("\n#{}: {:.1f} KiB in {} blocks\n".format(
+                index, stat.size / 1024, stat.count))
+            for line in stat.traceback.format():
+                fobj.write("{}\n".format(line))
+
+
+def _ignored_traces():
+    import tracemalloc
+    return [
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, tracemalloc.__file__),
+    ]
@@ -1,45 +1,184 @@
+# -*- coding: utf-8 -*-
 '''
 Created on May 17, 2014
 
 @author: ignacio
 '''
-from __future__ import absolute_import, unicode_literals, division
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
 
 import re
 import os
-import git
 
 from .objects import RepoData, RemoteData
+from .timings import GIT, REPO, timed
 
 
 BRANCH_NAME_RE = r"[a-zA-Z0-9#]+"
-
-
-def _get_repo():
-    try:
-        return git.Repo(".", search_parent_directories=True)
-    except git.exc.InvalidGitRepositoryError:
-        raise ValueError("Current directory '{}' does not belong to a git "
-                         "repository".format(os.path.abspath(".")))
+_BRANCH_NAME_RE = re.compile(BRANCH_NAME_RE)
+
+# Non-ASCII characters seen so far, mapped to their ASCII transliteration
+_TRANSLITERATIONS = {}
+
+# Letters that do not decompose into an ASCII base. Other scripts (Greek,
+# CJK...) are not transliterated, and are dropped from branch names
+_FALLBACKS = {
+    'ß': 'ss', 'æ': 'ae', 'Æ': 'AE', 'œ': 'oe', 'Œ': 'OE', 'ø': 'o',
+    'Ø': 'O', 'đ': 'd', 'Đ': 'D', 'ð': 'd', 'Ð': 'D', 'ł': 'l', 'Ł': 'L',
+    'þ': 'th', 'Þ': 'Th', 'ı': 'i',
+}
+_CYRILLIC = zip(
+    'абвгдежзийклмнопрстуфхцчшщъыьэюяієґ',
+    ['a', 'b', 'v', 'g', 'd', 'e', 'zh', 'z', 'i', 'i', 'k', 'l', 'm', 'n',
+     'o', 'p', 'r', 's', 't', 'u', 'f', 'kh', 'ts', 'ch', 'sh', 'shch', '',
+     'y', '', 'e', 'yu', 'ya', 'i', 'ye', 'g'])
+for _letter, _ascii in _CYRILLIC:
+    _FALLBACKS[_letter] = _ascii
+    _FALLBACKS[_letter.upper()] = _ascii.capitalize()
+del _CYRILLIC, _letter, _ascii
+
+
+class GitRepository(object):
+    '''
+    The git repository issue2branch runs on, discovered on first use.
+
+    Discovering a repository walks the parent directories and spawns git
+    processes, so a single instance is shared by a whole run (see
+    `get_repository`), which also caches its remotes and heads.
+    '''
+    def __init__(self, path=".", repo=None):
+        self._path = path
+        self._repo = repo
+        self._remotes = None
+        self._heads = None
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            with timed(REPO):
+                self._repo = self._discover()
+        return self._repo
+
+    def _discover(self):
+        import git  # Slow import, only done when a repository is needed
+        try:
+            return git.Repo(self._path, search_parent_directories=True)
+        except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
+            raise ValueError("Current directory '{}' does not belong to a "
+                             "git repository".format(
+                                 os.path.abspath(self._path)))
+
+    @property
+    def path(self):
+        ''' Where the repository is looked up from. '''
+        return self._path
+
+    @property
+    def working_dir(self):
+        return self.repo.working_dir
+
+    def get_remotes(self):
+        if self._remotes is None:
+            self._remotes = {r.name: r.url for r in self.repo.remotes}
+        return self._remotes
+
+    def get_heads(self):
+        if self._heads is None:
+            self._heads = {h.name: h for h in self.repo.heads}
+        return self._heads
+
+    def _create_head(self, branch):
+        head = self.repo.create_head(branch)
+        self.get_heads()[branch] = head
+        return head
+
+    def branch_and_move(self, branch):
+        with timed(GIT):
+            try:
+                head = self.get_heads()[branch]
+            except KeyError:  # Branch does not exist
+                head = self._create_head(branch)
+            head.checkout()
+
+    def create_branches(self, branches):
+        ''' Create the missing branches, without checking them out. '''
+        created = []
+        with timed(GIT):
+            for branch in branches:
+                if branch in self.get_heads():
+                    print("Branch '{}' already exists".format(branch))
+                    continue
+                self._create_head(branch)
+                created.append(branch)
+        return created
+
+
+_REPOSITORY = GitRepository()
+
+
+def get_repository():
+    ''' The repository for the current directory, shared by the process. '''
+    return _REPOSITORY
 
 
 def get_git_root():
-    return _get_repo().working_dir
+    return get_repository().working_dir
 
 
 def get_remotes():
-    return {r.name: r.url for r in _get_repo().remotes}
+    return get_repository().get_remotes()
 
 
 def branch_and_move(branch):
+    get_repository().branch_and_move(branch)
+
+
+def create_branches(branches):
+    return get_repository().create_branches(branches)
+
+
+def _transliterate_char(char):
+    try:
+        return _TRANSLITERATIONS[char]
+    except KeyError:
+        import unicodedata  # Only needed for non-ASCII titles
+        decomposed = unicodedata.normalize('NFKD', char)
+        ascii_char = "".join(_FALLBACKS.get(c, c) for c in decomposed)
+        ascii_char = ascii_char.encode('ascii', 'ignore').decode('ascii')
+        _TRANSLITERATIONS[char] = ascii_char
+        return ascii_char
+
+
+def _transliterate(title):
+    '''
+    Replace accented letters by their ASCII base, e.g. 'é' -> 'e', and some
+    other letters by an ASCII spelling, e.g. 'ß' -> 'ss' or 'ж' -> 'zh'.
+    '''
     try:
-        _get_repo().heads[branch].checkout()
-    except IndexError:  # Branch does not exist
-        _get_repo().create_head(branch).checkout()
+        title.encode('ascii')
+        return title
+    except UnicodeError:
+        return "".join(char if char < '\x80' else _transliterate_char(char)
+                       for char in title)
+
+
+def _truncate(name, max_length):
+    ''' Cut `name` to `max_length`, at a word boundary when possible. '''
+    if max_length is None or len(name) <= max_length:
+        return name
+    cut = name.rfind('-', 0, max_length + 1)
+    return name[:cut] if cut > 0 else name[:max_length]
+
+
+def get_branch_name(title, max_length=None):
+    words = _BRANCH_NAME_RE.findall(_transliterate(title))
+    return _truncate("-".join(words).lower(), max_length)
 
 
-def get_branch_name(title):
-    return "-".join(re.findall(BRANCH_NAME_RE, title)).lower()
+def get_branch_names(issues, max_length=None):
+    ''' Branch names for many issues, in order. '''
+    return [get_branch_name(issue.branch(), max_length=max_length)
+            for issue in issues]
 
 
 _SSH_RE = r"[^@]+@([^:]+):([^/]+)/(.+)"
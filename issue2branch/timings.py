@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Per-phase wall time, call counts and bytes of a run, enabled with `--timings`.
+
+Phases nest (resolving the tracker discovers the repository) and overlap
+across worker threads, so their times do not add up to the run's total.
+
+Timed blocks are reported to every enabled recorder: the `Timings` totals,
+and the trace of `--trace` (see `issue2branch.tracing`).
+
+Every run imports this module, so it only imports what `timed` needs.
+'''
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import collections
+import logging
+import sys
+import threading
+import time
+
+import six
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+IMPORTS = 'imports'
+CONFIG = 'config'
+REPO = 'repo'
+TRACKER = 'tracker'
+HTTP = 'http'
+DECODE = 'decode'
+PARSE = 'parse'
+RENDER = 'render'
+GIT = 'git'
+GIT_COMMAND = 'git-command'
+# Summary order, roughly the order of a run. Unknown phases go last
+PHASES = (IMPORTS, CONFIG, REPO, TRACKER, HTTP, DECODE, PARSE, RENDER, GIT,
+          GIT_COMMAND)
+
+
+class Timings(object):
+    ''' Thread safe totals of seconds, calls and bytes per phase. '''
+    def __init__(self, started=None):
+        self._started = time.time() if started is None else started
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def add(self, phase, seconds=0, count=1, nbytes=0):
+        with self._lock:
+            totals = self._phases.setdefault(
+                phase, {'seconds': 0, 'count': 0, 'bytes': 0})
+            totals['seconds'] += seconds
+            totals['count'] += count
+            totals['bytes'] += nbytes
+
+    def record(self, phase, start, seconds, nbytes=0, name=None, args=None):  # pylint: disable=unused-argument
+        self.add(phase, seconds, nbytes=nbytes)
+
+    @property
+    def elapsed(self):
+        ''' Wall time since the run started. '''
+        return time.time() - self._started
+
+    def phases(self):
+        ''' `(phase, totals)` pairs, in run order. '''
+        with self._lock:
+            phases = {k: dict(v) for k, v in self._phases.items()}
+        order = {phase: index for index, phase in enumerate(PHASES)}
+        return sorted(phases.items(),
+                      key=lambda item: (order.get(item[0], len(PHASES)),
+                                        item[0]))
+
+    def to_dict(self):
+        return {
+            'total': self.elapsed,
+            'phases': collections.OrderedDict(self.phases()),
+        }
+
+    def summary(self):
+        ''' A human readable table of the phases. '''
+        lines = ["{:10} {:>7} {:>10} {:>12}".format('Phase', 'Calls',
+                                                    'Seconds', 'Bytes')]
+        for phase, totals in self.phases():
+            lines.append("{:10} {:>7} {:>10.4f} {:>12}".format(
+                phase, totals['count'], totals['seconds'],
+                totals['bytes'] or '-'))
+        lines.append("{:10} {:>7} {:>10.4f}".format('total', '',
+                                                    self.elapsed))
+        return "\n".join(lines)
+
+
+class _Timer(object):
+    def __init__(self, recorders, phase, name=None):
+        self._recorders = recorders
+        self._phase = phase
+        self._name = name
+        self._start = None
+        self._bytes = 0
+        self._args = {}
+
+    def add_bytes(self, nbytes):
+        self._bytes += nbytes
+
+    def annotate(self, **kwargs):
+        ''' Details of the block, like an url, shown in traces. '''
+        self._args.update(kwargs)
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.time() - self._start
+        for recorder in self._recorders:
+            recorder.record(self._phase, self._start, seconds,
+                            nbytes=self._bytes, name=self._name,
+                            args=self._args)
+
+
+class _NoTimer(object):
+    ''' Stands for `_Timer` when timings are disabled, doing nothing. '''
+    def add_bytes(self, nbytes):
+        pass
+
+    def annotate(self, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+# Replaced, never mutated, so timers can iterate it without locking
+_recorders = ()  # pylint: disable=invalid-name
+
+
+def add_recorder(recorder):
+    '''
+    Report timed blocks to `recorder` too.
+
+    Recorders have a `record(phase, start, seconds, nbytes, name, args)`
+    method, called from whatever thread ran the block.
+    '''
+    global _recorders  # pylint: disable=global-statement,invalid-name
+    _recorders = _recorders + (recorder,)
+
+
+def enable(started=None):
+    ''' Start recording timings, from `started` (now by default). '''
+    timings = Timings(started)
+    add_recorder(timings)
+    return timings
+
+
+def disable():
+    ''' Stop all recorders, including traces. '''
+    global _recorders  # pylint: disable=global-statement,invalid-name
+    _recorders = ()
+
+
+def get_timings():
+    ''' The timings being recorded, or None if disabled. '''
+    for recorder in _recorders:
+        if isinstance(recorder, Timings):
+            return recorder
+    return None
+
+
+def timed(phase, name=None):
+    '''
+    Context manager adding the block's wall time to `phase`.
+
+    Bytes moved during the block are added with `add_bytes` on the value it
+    returns, and details for traces with `annotate`. `name` labels the block
+    in traces (`phase` by default). Costs next to nothing when nothing is
+    being recorded.
+    '''
+    recorders = _recorders
+    if not recorders:
+        return _NO_TIMER
+    return _Timer(recorders, phase, name=name)
+
+
+def record(phase, start, seconds):
+    ''' Report a block timed by other means, e.g. before recording started. '''
+    for recorder in _recorders:
+        recorder.record(phase, start, seconds)
+
+
+def time_git_commands():
+    ''' Time every git process GitPython spawns, as `git-command`. '''
+    from git.cmd import Git  # Slow import, only done when recording
+    execute = Git.execute
+    if getattr(execute, 'timed', False):
+        return
+
+    def timed_execute(self, command, *args, **kwargs):
+        words = [six.text_type(word) for word in (
+            command.split() if isinstance(command, six.string_types)
+            else command)]
+        name = "git {}".format(words[1]) if len(words) > 1 else words[0]
+        with timed(GIT_COMMAND, name=name) as timer:
+            timer.annotate(command=" ".join(words))
+            return execute(self, command, *args, **kwargs)
+    timed_execute.timed = True
+    Git.execute = timed_execute
+
+
+def add_timing_arguments(parser):
+    parser.add_argument("--timings",
+                        action='store_true', default=False,
+                        help=("Print the time spent on each phase of the run "
+                              "(config, http, parsing, git...) to stderr"))
+    parser.add_argument("--timings-file",
+                        default=None, metavar="PATH",
+                        help=("Append the --timings as a JSON line to this "
+                              "file, instead of printing them"))
+
+
+def get_timing_options(args):
+    '''
+    Whether to record timings for a command line, and the file to append
+    them to (None to print them).
+    '''
+    import argparse
+    parser = argparse.ArgumentParser(add_help=False)
+    add_timing_arguments(parser)
+    options, dummy_args = parser.parse_known_args(args)
+    return (options.timings or options.timings_file is not None,
+            options.timings_file)
+
+
+def report(timings, path=None, argv=None):
+    ''' Print the `timings` summary, or append them as JSON to `path`. '''
+    if path is None:
+        print(timings.summary(), file=sys.stderr)
+        return
+    import datetime
+    import io
+    import json
+    record = collections.OrderedDict([
+        ('date', datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")),
+        ('argv', list(sys.argv[1:] if argv is None else argv)),
+    ])
+    record.update(timings.to_dict())
+    with io.open(path, 'a', encoding='utf-8') as fobj:
+        fobj.write("{}\n".format(json.dumps(record)))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Chrome trace-event export of a run, enabled with `--trace`.
+
+Every block timed with `issue2branch.timings.timed` becomes a span on the
+thread that ran it, so the resulting file shows, in `chrome://tracing` or
+Perfetto, how HTTP requests, git processes, parsing and rendering overlap.
+'''
+from __future__ import (absolute_import, unicode_literals, division,
+                        print_function)
+
+import logging
+import os
+import sys
+import threading
+import time
+
+from . import timings
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+_MICROSECONDS = 1000000
+
+
+class Trace(object):
+    ''' Thread safe list of trace events, in the Trace Event Format. '''
+    def __init__(self, started=None):
+        self._started = time.time() if started is None else started
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}
+
+    def _timestamp(self, when):
+        return int((when - self._started) * _MICROSECONDS)
+
+    def record(self, phase, start, seconds, nbytes=0, name=None, args=None):
+        ''' Add a complete ('X') event for a timed block. '''
+        thread = threading.current_thread()
+        args = dict(args or {})
+        if nbytes:
+            args['bytes'] = nbytes
+        event = {
+            'name': name or phase,
+            'cat': phase,
+            'ph': 'X',
+            'ts': self._timestamp(start),
+            'dur': int(seconds * _MICROSECONDS),
+            'pid': self._pid,
+            'tid': thread.ident,
+            'args': args,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        # Metadata events name the threads, e.g. the fetching workers
+        events.extend({'name': 'thread_name', 'ph': 'M', 'pid': self._pid,
+                       'tid': tid, 'args': {'name': name}}
+                      for tid, name in sorted(threads.items()))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        import io
+        import json
+        with io.open(path, 'w', encoding='utf-8') as fobj:
+            fobj.write("{}".format(json.dumps(self.to_dict())))
+
+
+def enable(started=None):
+    '''
+    Start tracing timed blocks, from `started` (now by default).
+
+    Git processes are only traced after `timings.time_git_commands`.
+    '''
+    trace = Trace(started)
+    timings.add_recorder(trace)
+    return trace
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("--trace",
+                        default=None, metavar="PATH",
+                        help=("Save a Chrome trace of the run (http requests, "
+                              "git processes, parsing and rendering) to this "
+                              "file, for chrome://tracing or Perfetto"))
+
+
+def get_trace_output(args):
+    ''' Where to save the trace for a command line, or None. '''
+    import argparse
+    parser = argparse.ArgumentParser(add_help=False)
+    add_trace_arguments(parser)
+    options, dummy_args = parser.parse_known_args(args)
+    return options.trace
+
+
+def save(trace, path):
+    trace.save(path)
+    print("Trace saved to '{}'".format(path), file=sys.stderr)
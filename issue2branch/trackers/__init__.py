@@ -5,34 +5,40 @@ Created on May 17, 2014
 '''
 from __future__ import absolute_import, unicode_literals, division
 
+import collections
+import importlib
 import logging
 
-from ..repo import get_remotes
-from .bitbucket import Bitbucket
-from .github import Github
-from .redmine import Redmine
+from ..repo import get_repository
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
-ISSUE_TRACKERS = {
-    'redmine': Redmine,
-    'github': Github,
-    'bitbucket': Bitbucket,
-}
+# Tracker modules are only imported when needed, as they pull in `requests`.
+# Remote autodetection tries them in this order.
+ISSUE_TRACKERS = collections.OrderedDict([
+    ('github', ('.github', 'Github')),
+    ('bitbucket', ('.bitbucket', 'Bitbucket')),
+    ('redmine', ('.redmine', 'Redmine')),
+])
 
 
-def get_issue_tracker(config):
+def get_issue_tracker_class(tracker):
+    try:
+        module_name, class_name = ISSUE_TRACKERS[tracker]
+    except KeyError:
+        raise ValueError("'{}' is not a valid issue tracker".format(tracker))
+    module = importlib.import_module(module_name, __name__)
+    return getattr(module, class_name)
+
+
+def get_issue_tracker(config, repository=None):
     tracker = config.get('main', 'tracker', None)
-    remotes = get_remotes()
+    remotes = (repository or get_repository()).get_remotes()
     origin = remotes.get('origin', None)
     if tracker:
-        try:
-            issue_tracker_class = ISSUE_TRACKERS[tracker]
-        except KeyError:
-            raise ValueError("'{}' is not a valid issue tracker"
-                             .format(tracker))
+        issue_tracker_class = get_issue_tracker_class(tracker)
 
         return issue_tracker_class.create(
             config=config,
@@ -41,7 +47,8 @@ def get_issue_tracker(config):
         )
     elif origin:
         # try to autodeduce issue tracker from repo remotes
-        for issue_tracker_class in ISSUE_TRACKERS.values():
+        for issue_tracker_class in (get_issue_tracker_class(t)
+                                    for t in ISSUE_TRACKERS):
             if not issue_tracker_class.matches_remote(origin):
                 logger.debug("%s did not match remotes.", issue_tracker_class)
                 continue
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Non blocking facade for issue trackers.
+'''
+from __future__ import absolute_import, unicode_literals, division
+
+from multiprocessing.pool import ThreadPool
+import logging
+
+
+__all__ = ['AsyncIssueTracker', 'wait_all']
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class AsyncIssueTracker(object):
+    '''
+    Runs an `IssueTracker`'s operations on a pool of worker threads.
+
+    Every operation returns right away with an `AsyncResult`, whose `get()`
+    blocks until the result is available (re-raising the operation's
+    exception, if any). All the operations share the tracker's HTTP session,
+    cache and credentials.
+
+    Works as a context manager, waiting for pending operations on exit.
+    '''
+    def __init__(self, tracker, workers=None):
+        self._tracker = tracker
+        self._workers = workers or tracker.workers
+        self._pool = None
+
+    @property
+    def tracker(self):
+        return self._tracker
+
+    def _submit(self, func, *args):
+        if self._pool is None:
+            # Workers must not prompt for the password concurrently
+            self._tracker._ask_for_password()  # pylint: disable=protected-access
+            self._pool = ThreadPool(self._workers)
+        return self._pool.apply_async(func, args)
+
+    def get_issue(self, issue, config, options):
+        return self._submit(self._tracker.get_issue, issue, config, options)
+
+    def get_issues(self, issues, config, options):
+        ''' Start fetching several issues. Results are in `issues` order. '''
+        return [self.get_issue(issue, config, options) for issue in issues]
+
+    def get_issue_list(self, config, options):
+        return self._submit(self._tracker.get_issue_list, config, options)
+
+    def take_issue(self, issue, config, options):
+        return self._submit(self._tracker._take_issue,  # pylint: disable=protected-access
+                            issue, config, options)
+
+    def close(self):
+        ''' Wait for pending operations and stop the workers. '''
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def wait_all(results):
+    ''' Block until all the `AsyncResult`s are ready, returning their values. '''
+    return [result.get() for result in results]
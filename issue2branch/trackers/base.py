@@ -7,26 +7,85 @@ from __future__ import unicode_literals, print_function
 
 from argparse import ArgumentParser
 from getpass import getpass
+import collections
+import datetime
 import logging
-import requests
-
-from ..repo import branch_and_move, get_branch_name, parse_remote_url
-from ..format import colorize
+import re
+import sys
+
+from ..cache import CacheMiss, IssueCache
+from ..repo import (get_branch_name, get_branch_names, get_repository,
+                    parse_remote_url)
+from ..format import colorize, configure_colors
+from ..issue import IssueTree
 from ..objects import RepoData
-from ..utils.requests import request, get_response_content
+from ..output import FORMATS, TEXT, get_issue_writer, open_output
+from ..timings import PARSE, RENDER, add_timing_arguments, timed
+from ..utils.requests import (
+    request, get_response_content, get_validators, get_links,
+    conditional_headers, configure_rate_limits, create_session, NOT_MODIFIED,
+    DEFAULT_POOL_SIZE, DEFAULT_RETRIES, DEFAULT_BACKOFF,
+    DEFAULT_RATE_LIMIT_WAIT)
 
 
-__all__ = ['IssueTracker', 'RepoIssueTracker']
+__all__ = ['IssueTracker', 'RepoIssueTracker', 'Page']
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
+Page = collections.namedtuple('Page', ['content', 'links'])
+
+_ISSUE_RANGE_RE = re.compile(r"^(\d+)-(\d+)$")
+
+_SYNC_OVERLAP = datetime.timedelta(minutes=1)
+_SYNC_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _read_lines(path):
+    ''' The lines of a file, or of stdin for `-`. '''
+    if path == '-':
+        return sys.stdin.readlines()
+    try:
+        with open(path) as fobj:
+            return fobj.readlines()
+    except (IOError, OSError) as err:
+        raise ValueError("Could not read issues from '{}': {}".format(
+            path, err))
+
+
 class IssueTracker(object):
     _DEFAULT_LIST_LIMIT = 40
-
-    def __init__(self, user=None, password=None):
+    _DEFAULT_WORKERS = 4
+    # Whether issues can have a parent. Lists without subtasks are printed
+    # as their pages arrive, in the tracker's order, and counted at the end.
+    # With subtasks, any later page may hold a child of an issue already
+    # seen, so the tree is only printed (sorted by id) after the last page.
+    SUBTASKS = False
+
+    def __init__(self, user=None, password=None, cache=None, session=None,
+                 workers=_DEFAULT_WORKERS):
         self._user = user
         self._password = password
+        self._cache = cache
+        self._session = session
+        self._workers = workers
+
+    @property
+    def session(self):
+        ''' The pooled HTTP session shared by all of this tracker's requests. '''
+        if self._session is None:
+            self._session = create_session()
+        return self._session
+
+    @property
+    def workers(self):
+        ''' Max amount of concurrent requests this tracker makes. '''
+        return self._workers
+
+    @property
+    def scope(self):
+        ''' Identifies the issues this tracker serves, e.g. for caching. '''
+        return self.__class__.__name__
 
     def _ask_for_password(self):
         if not self._user:
@@ -47,11 +106,97 @@ class IssueTracker(object):
     def parse_issue_list(self, content, config, options):
         raise NotImplementedError()
 
+    def _fetch(self, key, url, options):
+        '''
+        GET and decode `url`, going through the cache when enabled.
+
+        Returns a `Page` with the decoded content and the response's `Link`
+        header relations. Stale cache entries are revalidated with a
+        conditional request, and reused as is if the server answers 304 Not
+        Modified. A None `key` skips the cache.
+        '''
+        if self._cache is None or key is None:
+            response = self._request(self.session.get, url)
+            return Page(get_response_content(response), get_links(response))
+
+        entry = self._cache.get_entry(key)
+        if entry is not None and not options.refresh:
+            if options.offline or self._cache.is_fresh(entry):
+                return Page(entry['content'], entry.get('links', {}))
+        if options.offline:
+            raise CacheMiss(key)
+
+        kwargs = {}
+        if entry is not None and entry.get('validators'):
+            kwargs['headers'] = conditional_headers(entry['validators'])
+        response = self._request(self.session.get, url, **kwargs)
+        if response.status_code == NOT_MODIFIED:
+            logger.debug("'%s' was not modified", url)
+            entry = self._cache.revalidate(entry)
+            return Page(entry['content'], entry.get('links', {}))
+        page = Page(get_response_content(response), get_links(response))
+        self._cache.set(key, page.content, validators=get_validators(response),
+                        links=page.links)
+        return page
+
+    def _get_content(self, key, url, options):
+        return self._fetch(key, url, options).content
+
+    def _map_concurrently(self, func, items):
+        '''
+        Yield `func(item)` for every item, in order, running up to `workers`
+        calls at the same time.
+        '''
+        items = list(items)
+        if self._workers <= 1 or len(items) <= 1:
+            for item in items:
+                yield func(item)
+            return
+        from multiprocessing.pool import ThreadPool
+        self._ask_for_password()  # Before any worker needs it
+        pool = ThreadPool(min(self._workers, len(items)))
+        try:
+            for result in pool.imap(func, items):
+                yield result
+        finally:
+            pool.terminate()
+
+    def _issue_cache_key(self, issue):
+        return "{}#issue:{}".format(self.scope, issue)
+
+    def _list_cache_key(self, url):
+        return "{}#list:{}".format(self.scope, url)
+
     def get_issue_list(self, config, options):
         url = self.get_issue_list_url(config, options)
-        response = self._request(requests.get, url)
-        content = get_response_content(response)
-        return self.parse_issue_list(content, config, options)
+        content = self._get_content(self._list_cache_key(url), url, options)
+        with timed(PARSE):
+            return self.parse_issue_list(content, config, options)
+
+    def iter_issue_pages(self, config, options):
+        '''
+        Yield the issue list in chunks, as they are fetched.
+
+        Trackers that page their issue lists override this to yield each page
+        as soon as it arrives.
+        '''
+        yield self.get_issue_list(config, options)
+
+    def get_sync_scope(self, config, options):  # pylint: disable=unused-argument
+        '''
+        Identifies what `--sync` fetches, to keep its last sync timestamp.
+
+        Trackers that sync a filtered subset of their issues, like a single
+        project, extend the scope with the filter.
+        '''
+        return self.scope
+
+    def iter_updated_issue_pages(self, config, options, since):
+        '''
+        Yield, page by page, all the issues (open or closed) updated after
+        `since` (an ISO 8601 UTC timestamp), or all of them if it is None.
+        '''
+        raise NotImplementedError()
 
 
     def get_issue_url(self, issue, config, options):
@@ -62,13 +207,19 @@ class IssueTracker(object):
 
     def get_issue(self, issue, config, options):
         url = self.get_issue_url(issue, config, options)
-        response = self._request(requests.get, url)
-        content = get_response_content(response)
-        return self.parse_issue(content, config, options)
+        content = self._get_content(self._issue_cache_key(issue), url,
+                                    options)
+        with timed(PARSE):
+            return self.parse_issue(content, config, options)
 
     def take_issue(self, issue, config, options):
         raise NotImplementedError()
 
+    def _take_issue(self, issue, config, options):
+        self.take_issue(issue, config, options)
+        if self._cache is not None:
+            self._cache.delete(self._issue_cache_key(issue))
+
     @classmethod
     def parse_args(cls):
         return cls.get_arg_parser().parse_args()
@@ -78,6 +229,13 @@ class IssueTracker(object):
         parser = ArgumentParser()
         parser.add_argument("issue", nargs='?',
                             help="Issue to start working on")
+        parser.add_argument("more_issues", nargs='*', metavar="issue",
+                            help=("More issues, to create a branch for each. "
+                                  "Ranges like 19-40 are accepted"))
+        parser.add_argument("--from-file",
+                            default=None, metavar="PATH",
+                            help=("Read issues to branch from this file, one "
+                                  "per line. Use - for stdin"))
         parser.add_argument("-l", "--list",
                             action='store_true', default=False,
                             help="List current issues")
@@ -93,6 +251,36 @@ class IssueTracker(object):
         parser.add_argument("-s", "--show",
                             default=None,
                             help="Show the issue on screen")
+        parser.add_argument("--sync",
+                            action='store_true', default=False,
+                            help=("Fetch the issues updated since the last "
+                                  "--sync into the local search index"))
+        parser.add_argument("--format",
+                            choices=FORMATS, default=TEXT,
+                            help=("Output format for --list, --search and "
+                                  "--show. Machine readable ones are not "
+                                  "colored, and progress goes to stderr"))
+        parser.add_argument("--daemon",
+                            action='store_true', default=False,
+                            help=("Keep the issue list warm in the background "
+                                  "and serve it to other runs"))
+        parser.add_argument("--search",
+                            default=None,
+                            help=("Search previously listed issues by text, "
+                                  "without network access"))
+        from ..profiling import add_profile_arguments
+        add_profile_arguments(parser)
+        add_timing_arguments(parser)
+        from ..tracing import add_trace_arguments
+        add_trace_arguments(parser)
+        cache_group = parser.add_mutually_exclusive_group()
+        cache_group.add_argument("--offline",
+                                 action='store_true', default=False,
+                                 help="Only use cached issues, even if stale")
+        cache_group.add_argument("--refresh",
+                                 action='store_true', default=False,
+                                 help="Ignore cached issues and fetch them "
+                                      "again")
         return parser
 
     @classmethod
@@ -106,11 +294,55 @@ class IssueTracker(object):
             raise ValueError("List limit must be positive: {}".format(limit))
         return limit
 
-    def run(self, config):
+    @staticmethod
+    def get_branch_max_length(config):
+        max_length = config.get('branch', 'max_length', None, coerce=int)
+        if max_length is not None and max_length <= 0:
+            raise ValueError("Branch max length must be positive: {}"
+                             .format(max_length))
+        return max_length
+
+    @staticmethod
+    def get_issue_ids(options):
+        '''
+        The issues to branch from the command line and --from-file, in order.
+
+        Numeric ranges, like `19-40`, are expanded.
+        '''
+        args = [options.issue] + list(options.more_issues)
+        if options.from_file is not None:
+            args.extend(line.split('#', 1)[0].strip()
+                        for line in _read_lines(options.from_file))
+        issue_ids = []
+        for arg in args:
+            if not arg:
+                continue
+            mobj = _ISSUE_RANGE_RE.match(arg)
+            if mobj is None:
+                issue_ids.append(arg)
+                continue
+            start, end = (int(x) for x in mobj.groups())
+            if start > end:
+                raise ValueError("Invalid issue range: '{}'".format(arg))
+            issue_ids.extend(str(x) for x in range(start, end + 1))
+        return list(collections.OrderedDict.fromkeys(issue_ids))
+
+    def run(self, config, repository=None):
         options = self.parse_args()
-        if not any([options.issue, options.list,
-                    options.show]):
-            raise ValueError("Must supply an issue, -s/--show or -l/--list")
+        repository = repository or get_repository()
+        if options.daemon:
+            self._serve(config, options)
+            return
+        issue_ids = self.get_issue_ids(options)
+        if not any([issue_ids, options.list,
+                    options.show, options.search, options.sync]):
+            raise ValueError("Must supply an issue, -s/--show, -l/--list, "
+                             "--search or --sync")
+        if options.offline and self._cache is None:
+            raise ValueError("--offline needs the cache to be enabled")
+
+        client = self._get_daemon_client(config, options)
+        configure_colors(config)
 
         def _op(message, callback, *args, **kwargs):
             if options.noop:
@@ -121,29 +353,29 @@ class IssueTracker(object):
 
         if options.list:
             try:
-                issues = self.get_issue_list(config, options)
+                self._list(config, options, client)
             except NotImplementedError:
                 print(("[ERROR] Issue list is not implemented for {}"
                        .format(self.__class__)))
-                return
-            print("Got {} issues".format(len(issues)))
-
-            issues = {issue.issue_id: issue for issue in issues}
-            childs = set()
-
-            for issue_id, issue in list(issues.items()):
-                parent = issue.parent
-                if parent is not None and parent in issues:
-                    issues[parent].childs[issue_id] = issue
-                    childs.add(issue_id)
-
-            for child in childs:
-                del issues[child]
-
-            self._list_issues(issues)
+        elif options.sync:
+            self._sync(config, options)
+        elif options.search is not None:
+            with self._open_index(config) as index:
+                issues = index.search(self.scope, options.search,
+                                      limit=self.get_list_limit(config,
+                                                                options))
+            with open_output(config, options.format) as out:
+                print("Found {} issues".format(len(issues)),
+                      file=self._status_stream(options, out))
+                self._list_issues(issues, options, out)
         elif options.show is not None:
-            print("Showing issue {}".format(options.show))
-            issue = self.get_issue(options.show, config, options)
+            print("Showing issue {}".format(options.show),
+                  file=self._status_stream(options, sys.stdout))
+            issue = self._get_issue(options.show, config, options, client)
+            if options.format != TEXT:
+                with get_issue_writer(options.format, many=False) as writer:
+                    self._write_issues([issue], writer)
+                return
             print()
             print("{} #{}: {}".format(colorize(issue.tag), issue.issue_id,
                                       issue.title))
@@ -152,28 +384,196 @@ class IssueTracker(object):
                 print(issue.description)
             else:
                 print("<No description>")
+        elif len(issue_ids) > 1:
+            self._branch_issues(issue_ids, config, options, repository, _op)
         else:
+            issue_id, = issue_ids
             print(("Getting issue title for issue: "
-                   "'{}'".format(options.issue)))
-            branch = self.get_issue(options.issue, config, options).branch()
+                   "'{}'".format(issue_id)))
+            branch = self._get_issue(issue_id, config, options,
+                                     client).branch()
             print("Got branch: '{}'".format(branch))
-            branch = get_branch_name(branch)
+            branch = get_branch_name(
+                branch, max_length=self.get_branch_max_length(config))
             _op("Branching '{}'".format(branch),
-                branch_and_move, branch)
+                repository.branch_and_move, branch)
 
             if options.take:
                 try:
-                    _op("Taking issue: {}".format(options.issue),
-                        self.take_issue, options.issue, config, options)
+                    _op("Taking issue: {}".format(issue_id),
+                        self._take_issue, issue_id, config, options)
                 except NotImplementedError:
                     print(("[ERROR] Issue taking is not implemented for {}"
                            .format(self.__class__)))
 
+    def _serve(self, config, options):
+        from ..daemon import IssueDaemon
+        daemon = IssueDaemon.from_config(self, config, options)
+        print("Serving {} issues on '{}'".format(self.scope, daemon.path))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print("Daemon stopped")
+
+    @staticmethod
+    def _open_index(config):
+        ''' The local issue index. sqlite3 is only imported when needed. '''
+        from ..index import IssueIndex
+        return IssueIndex.from_config(config)
+
+    def _get_daemon_client(self, config, options):
+        ''' A client for this tracker's daemon, if one should be used. '''
+        if options.offline or options.refresh:
+            return None
+        from ..daemon import DaemonClient
+        return DaemonClient.from_config(config, self.scope)
+
+    def _iter_list_pages(self, config, options, client=None):
+        ''' Like `iter_issue_pages`, asking the daemon first. '''
+        if client is not None:
+            from ..daemon import DaemonUnavailable
+            try:
+                yield client.get_issue_list(self, config, options)
+                return
+            except DaemonUnavailable as err:
+                logger.debug("Daemon could not list issues: %s", err)
+        for page in self.iter_issue_pages(config, options):
+            yield page
+
+    def _get_issue(self, issue, config, options, client=None):
+        ''' Like `get_issue`, asking the daemon first. '''
+        if client is not None:
+            from ..daemon import DaemonUnavailable
+            try:
+                return client.get_issue(self, issue)
+            except DaemonUnavailable as err:
+                logger.debug("Daemon could not get issue: %s", err)
+        return self.get_issue(issue, config, options)
+
+    def _list(self, config, options, client=None):
+        '''
+        Print the issue list, indexing it along the way.
+
+        See `SUBTASKS` for when output starts and how issues are ordered.
+        '''
+        pages = self._iter_list_pages(config, options, client)
+        with self._open_index(config) as index, \
+                open_output(config, options.format) as out:
+            status = self._status_stream(options, out)
+            if not self.SUBTASKS:
+                count = 0
+                with get_issue_writer(options.format, stream=out) as writer:
+                    for page in pages:
+                        index.try_update(self.scope, page)
+                        self._write_issues(page, writer)
+                        out.flush()
+                        count += len(page)
+                print("Got {} issues".format(count), file=status)
+                return
+            tree = IssueTree()
+            for page in pages:
+                tree.extend(page)
+                index.try_update(self.scope, page)
+            print("Got {} issues".format(len(tree)), file=status)
+            self._list_issues(
+                (issue for _, issue in sorted(tree.roots.items())), options,
+                out)
+
+    @staticmethod
+    def _status_stream(options, out):
+        ''' Where to report progress, so it does not mix with data. '''
+        return out if options.format == TEXT else sys.stderr
+
+    def _sync(self, config, options):
+        ''' Merge the issues updated since the last sync into the index. '''
+        with self._open_index(config) as index:
+            sync_scope = self.get_sync_scope(config, options)
+            since = index.get_last_sync(sync_scope)
+            # Overlap syncs a bit, so clock skew does not lose updates
+            started = datetime.datetime.utcnow() - _SYNC_OVERLAP
+            if since is None:
+                print("Syncing all issues")
+            else:
+                print("Syncing issues updated since {}".format(since))
+            count = 0
+            try:
+                for page in self.iter_updated_issue_pages(config, options,
+                                                          since):
+                    index.update(self.scope, page)
+                    count += len(page)
+            except NotImplementedError:
+                print(("[ERROR] Issue sync is not implemented for {}"
+                       .format(self.__class__)))
+                return
+            index.set_last_sync(sync_scope,
+                                started.strftime(_SYNC_TIMESTAMP_FORMAT))
+        print("Synced {} issues".format(count))
+
+    def _branch_issues(self, issue_ids, config, options, repository, _op):
+        ''' Create (without checking out) a branch for each issue. '''
+        from .asynchronous import AsyncIssueTracker, wait_all
+        print("Getting issue titles for {} issues".format(len(issue_ids)))
+        issues, failed = [], []
+        with AsyncIssueTracker(self) as async_tracker:
+            results = async_tracker.get_issues(issue_ids, config, options)
+            # A failing issue must not lose the others
+            for issue_id, result in zip(issue_ids, results):
+                try:
+                    issues.append(result.get())
+                except Exception as err:  # pylint: disable=broad-except
+                    print("[ERROR] Could not get issue '{}': {}".format(
+                        issue_id, err))
+                    failed.append(issue_id)
+        if not issues:
+            raise ValueError("Could not get any of the issues")
+        issue_ids = [i for i in issue_ids if i not in failed]
+        branches = get_branch_names(
+            issues, max_length=self.get_branch_max_length(config))
+        for branch in branches:
+            print("Got branch: '{}'".format(branch))
+        _op("Creating {} branches".format(len(branches)),
+            repository.create_branches, branches)
+
+        if options.take:
+            def take_all():
+                with AsyncIssueTracker(self) as async_tracker:
+                    wait_all([async_tracker.take_issue(issue_id, config,
+                                                       options)
+                              for issue_id in issue_ids])
+            try:
+                _op("Taking issues: {}".format(", ".join(issue_ids)),
+                    take_all)
+            except NotImplementedError:
+                print(("[ERROR] Issue taking is not implemented for {}"
+                       .format(self.__class__)))
+        if failed:
+            print("[ERROR] Skipped {} issues: {}".format(len(failed),
+                                                         ", ".join(failed)))
+
     @classmethod
-    def _list_issues(cls, issues, indent=0):
-        for dummy_issue_id, issue in sorted(issues.items()):
-            print("{} * {}".format("  " * indent, issue.text()))
-            cls._list_issues(issue.childs, indent=indent + 1)
+    def _list_issues(cls, issues, options, out=None):
+        with get_issue_writer(options.format, stream=out) as writer:
+            cls._write_issues(issues, writer)
+
+    @classmethod
+    def _write_issues(cls, issues, writer):
+        with timed(RENDER):
+            for depth, issue in cls._walk_issues(issues):
+                writer.write(issue, depth=depth)
+
+    @staticmethod
+    def _walk_issues(issues):
+        '''
+        Yield `(depth, issue)` for the issues and their childs, depth first.
+
+        Iterative, so long chains of subtasks do not hit the recursion limit.
+        '''
+        stack = [(0, issue) for issue in reversed(list(issues))]
+        while stack:
+            depth, issue = stack.pop()
+            yield depth, issue
+            stack.extend((depth + 1, child) for _, child
+                         in sorted(issue.childs.items(), reverse=True))
 
     @classmethod
     def extract_or_none(cls, json_obj, *keys):
@@ -198,16 +598,41 @@ class IssueTracker(object):
         user = kwargs.pop('user', None) or config.get('auth', 'user', None)
         password = (kwargs.pop('password', None) or
                     config.get('auth', 'password', None))
-        return cls(user=user, password=password, **kwargs)
+        cache = kwargs.pop('cache', None) or IssueCache.from_config(config)
+        session = (kwargs.pop('session', None) or
+                   cls.create_session_from_config(config))
+        workers = config.get('http', 'workers', cls._DEFAULT_WORKERS,
+                             coerce=int)
+        if workers <= 0:
+            raise ValueError("Workers must be positive: {}".format(workers))
+        configure_rate_limits(config.get('http', 'rate_limit_wait',
+                                         DEFAULT_RATE_LIMIT_WAIT,
+                                         coerce=float))
+        return cls(user=user, password=password, cache=cache, session=session,
+                   workers=kwargs.pop('workers', workers), **kwargs)
+
+    @staticmethod
+    def create_session_from_config(config):
+        return create_session(
+            pool_size=config.get('http', 'pool_size', DEFAULT_POOL_SIZE,
+                                 coerce=int),
+            retries=config.get('http', 'retries', DEFAULT_RETRIES, coerce=int),
+            backoff=config.get('http', 'backoff', DEFAULT_BACKOFF,
+                               coerce=float),
+        )
 
 
 class RepoIssueTracker(IssueTracker):  # pylint: disable=abstract-method
-    def __init__(self, repo_user, repo_name,
-                 user=None, password=None):
-        IssueTracker.__init__(self, user=user, password=password)
+    def __init__(self, repo_user, repo_name, **kwargs):
+        IssueTracker.__init__(self, **kwargs)
         self.__repo_user = repo_user
         self.__repo_name = repo_name
 
+    @property
+    def scope(self):
+        return "{}:{}/{}".format(self.__class__.__name__, self.repo_user,
+                                 self.repo_name)
+
     @property
     def repo_user(self):
         return self.__repo_user
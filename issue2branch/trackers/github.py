@@ -5,34 +5,39 @@ Created on May 17, 2014
 '''
 from __future__ import absolute_import, unicode_literals, division
 
+import itertools
 import json
-import requests
 
-from six.moves.urllib.parse import urlencode  # pylint: disable=import-error
+from six.moves.urllib.parse import (  # pylint: disable=import-error
+    urlencode, urlparse, parse_qs
+)
 
 from .base import RepoIssueTracker
 from ..issue import Issue
 from ..objects import RepoData
+from ..timings import PARSE, timed
 
 _VALID_TAGS = set(('bug', 'enhancement', 'documentation', 'feature',
                    'new feature'))
 
 _PRIORITY_TAG_PREFIX = "priority:"
 
+_MAX_PER_PAGE = 100
+
 
 class Github(RepoIssueTracker):
-    def __init__(self, repo_user, repo_name,
-                 user=None, password=None):
+    def __init__(self, repo_user, repo_name, **kwargs):
         if repo_name.endswith('.git'):
             repo_name = repo_name[:-4]
-        super(Github, self).__init__(repo_user, repo_name,
-                                     user=user,
-                                     password=password)
+        super(Github, self).__init__(repo_user, repo_name, **kwargs)
 
-    def get_issue_list_url(self, config, options):
+    def get_issue_list_url(self, config, options, page=1):
         params = {
-            'per_page': self.get_list_limit(config, options),
+            'per_page': min(self.get_list_limit(config, options),
+                            _MAX_PER_PAGE),
         }
+        if page > 1:
+            params['page'] = page
         return self._api_url("repos/{}/{}/issues?{}".format(
             self.repo_user, self.repo_name, urlencode(params),
         ))
@@ -40,6 +45,78 @@ class Github(RepoIssueTracker):
     def parse_issue_list(self, content, config, options):
         return [self.parse_issue(issue, config, options) for issue in content]
 
+    def get_issue_list(self, config, options):
+        return [issue for page in self.iter_issue_pages(config, options)
+                for issue in page]
+
+    def get_updated_issue_list_url(self, since, page=1):
+        params = [
+            ('state', 'all'),
+            ('sort', 'updated'),
+            ('direction', 'asc'),
+            ('per_page', _MAX_PER_PAGE),
+        ]
+        if since is not None:
+            params.append(('since', since))
+        if page > 1:
+            params.append(('page', page))
+        return self._api_url("repos/{}/{}/issues?{}".format(
+            self.repo_user, self.repo_name, urlencode(params),
+        ))
+
+    def iter_issue_pages(self, config, options):
+        limit = self.get_list_limit(config, options)
+        return self._iter_pages(
+            lambda page: self.get_issue_list_url(config, options, page=page),
+            config, options, per_page=min(limit, _MAX_PER_PAGE), limit=limit)
+
+    def iter_updated_issue_pages(self, config, options, since):
+        return self._iter_pages(
+            lambda page: self.get_updated_issue_list_url(since, page=page),
+            config, options, per_page=_MAX_PER_PAGE, cached=False)
+
+    def _iter_pages(self, page_url, config, options, per_page, limit=None,
+                    cached=True):
+        '''
+        Yield an issue list page by page, up to `limit` issues if given.
+
+        `page_url` builds the url for a given page number. When the first
+        page links to the last one, the remaining pages are fetched
+        concurrently. Otherwise, `next` links are followed one by one.
+        '''
+        def fetch(url):
+            key = self._list_cache_key(url) if cached else None
+            page = self._fetch(key, url, options)
+            with timed(PARSE):
+                return page, self.parse_issue_list(page.content, config,
+                                                   options)
+
+        page, issues = fetch(page_url(1))
+        last_page = _page_number(page.links.get('last'))
+        if last_page is not None:
+            if limit is not None:
+                last_page = min(last_page, -(-limit // per_page))
+            pages = self._map_concurrently(
+                fetch, [page_url(number) for number in range(2, last_page + 1)])
+        else:
+            pages = self._follow_next_links(page, fetch)
+
+        remaining = limit
+        for issues in itertools.chain([issues], (i for _p, i in pages)):
+            if remaining is None:
+                yield issues
+                continue
+            yield issues[:remaining]
+            remaining -= len(issues)
+            if remaining <= 0:
+                return
+
+    @staticmethod
+    def _follow_next_links(page, fetch):
+        while 'next' in page.links:
+            page, issues = fetch(page.links['next'])
+            yield page, issues
+
     def get_issue_url(self, issue, config, options):
         return self._api_url("repos/{}/{}/issues/{}".format(
             self.repo_user, self.repo_name, issue,
@@ -59,7 +136,7 @@ class Github(RepoIssueTracker):
     def take_issue(self, issue, config, options):
         url = self.get_issue_url(issue, config, options)
         data = json.dumps({'assignee': self._user})
-        self._request(requests.patch, url, data=data)
+        self._request(self.session.patch, url, data=data)
 
     @staticmethod
     def _api_url(path):
@@ -86,3 +163,12 @@ class Github(RepoIssueTracker):
             user=config.get('github', 'repo_user', None),
             name=config.get('github', 'repo_name', None),
         )
+
+
+def _page_number(url):
+    if url is None:
+        return None
+    try:
+        return int(parse_qs(urlparse(url).query)['page'][0])
+    except (KeyError, IndexError, ValueError):
+        return None
@@ -5,20 +5,30 @@ Created on May 17, 2014
 '''
 from __future__ import unicode_literals, print_function
 
+import itertools
 import json
-import requests
 
 from six.moves.urllib.parse import urlencode  # pylint: disable=import-error
 
 from .base import IssueTracker
 from ..issue import Issue
+from ..timings import PARSE, timed
+
+
+_MAX_PER_PAGE = 100
 
 
 class Redmine(IssueTracker):
+    SUBTASKS = True
+
     def __init__(self, base_url, **kwargs):
         super(Redmine, self).__init__(**kwargs)
         self._base_url = base_url
 
+    @property
+    def scope(self):
+        return "Redmine:{}".format(self._base_url)
+
     @staticmethod
     def get_project(config, options):
         project = config.get('redmine', 'project', None)
@@ -28,10 +38,12 @@ class Redmine(IssueTracker):
             project = None
         return project
 
-    def get_issue_list_url(self, config, options):
+    def get_issue_list_url(self, config, options, offset=0):
         params = {
-            'limit': self.get_list_limit(config, options),
+            'limit': min(self.get_list_limit(config, options), _MAX_PER_PAGE),
         }
+        if offset:
+            params['offset'] = offset
         if options.mine:
             params['assigned_to_id'] = 'me'
         if options.version:
@@ -39,7 +51,6 @@ class Redmine(IssueTracker):
         if options.all:
             params['status_id'] = "*"
         project = self.get_project(config, options)
-        print(self._base_url)
         base_url = (self._base_url if project is None
                     else "{}/projects/{}".format(self._base_url, project))
         return "{}/issues.json?{}".format(base_url, urlencode(params))
@@ -47,6 +58,87 @@ class Redmine(IssueTracker):
     def parse_issue_list(self, content, config, options):
         return [self.extract_issue(issue) for issue in content['issues']]
 
+    def get_sync_scope(self, config, options):
+        project = self.get_project(config, options)
+        if project is None:
+            return self.scope
+        return "{}#project:{}".format(self.scope, project)
+
+    def get_updated_issue_list_url(self, config, options, since, offset=0):
+        params = {
+            'limit': _MAX_PER_PAGE,
+            'status_id': '*',
+            'sort': 'updated_on',
+        }
+        if since is not None:
+            params['updated_on'] = '>={}'.format(since)
+        if offset:
+            params['offset'] = offset
+        project = self.get_project(config, options)
+        base_url = (self._base_url if project is None
+                    else "{}/projects/{}".format(self._base_url, project))
+        return "{}/issues.json?{}".format(base_url, urlencode(params))
+
+    def _iter_issue_list_contents(self, config, options):
+        limit = self.get_list_limit(config, options)
+        return self._iter_contents(
+            lambda offset: self.get_issue_list_url(config, options,
+                                                   offset=offset),
+            options, per_page=min(limit, _MAX_PER_PAGE), limit=limit)
+
+    def _iter_contents(self, offset_url, options, per_page, limit=None,
+                       cached=True):
+        '''
+        Yield an issue list's contents page by page, up to `limit` issues if
+        given.
+
+        `offset_url` builds the url for a given offset. The first page's
+        `total_count` tells how many pages are left, which are then fetched
+        concurrently and yielded in offset order.
+        '''
+        def fetch(offset):
+            url = offset_url(offset)
+            key = self._list_cache_key(url) if cached else None
+            return self._get_content(key, url, options)
+
+        first = fetch(0)
+        total = first.get('total_count', 0)
+        if limit is not None:
+            total = min(limit, total)
+        remaining = limit
+        for content in itertools.chain(
+                [first],
+                self._map_concurrently(fetch, range(per_page, total, per_page))):
+            if remaining is not None:
+                content = dict(content, issues=content['issues'][:remaining])
+                remaining -= len(content['issues'])
+            yield content
+
+    def get_issue_list(self, config, options):
+        contents = list(self._iter_issue_list_contents(config, options))
+        merged = {
+            'issues': [issue for content in contents
+                       for issue in content['issues']],
+        }
+        with timed(PARSE):
+            return self.parse_issue_list(merged, config, options)
+
+    def iter_issue_pages(self, config, options):
+        for content in self._iter_issue_list_contents(config, options):
+            with timed(PARSE):
+                issues = self.parse_issue_list(content, config, options)
+            yield issues
+
+    def iter_updated_issue_pages(self, config, options, since):
+        contents = self._iter_contents(
+            lambda offset: self.get_updated_issue_list_url(
+                config, options, since, offset=offset),
+            options, per_page=_MAX_PER_PAGE, cached=False)
+        for content in contents:
+            with timed(PARSE):
+                issues = self.parse_issue_list(content, config, options)
+            yield issues
+
     def get_issue_url(self, issue, config, options):
         return "{}/issues/{}.json".format(self._base_url, issue)
 
@@ -77,7 +169,8 @@ class Redmine(IssueTracker):
 
         headers = {'content-type': 'application/json'}
         print("Updating issue #{}: {}".format(issue, payload))
-        self._request(requests.put, self.get_issue_url(issue, config, options),
+        self._request(self.session.put,
+                      self.get_issue_url(issue, config, options),
                       data=json.dumps(payload), headers=headers)
 
     @classmethod
@@ -5,17 +5,56 @@ helpers for the requests library
 '''
 from __future__ import absolute_import, unicode_literals, print_function
 
+import email.utils
+import importlib
+import json
 import logging
+import sys
+import threading
+import time
 import warnings
 
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecurePlatformWarning
+from requests.packages.urllib3.util.retry import Retry
+from six.moves.urllib.parse import urlparse  # pylint: disable=import-error
+import requests
+
+from .. import timings
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
+NOT_MODIFIED = 304
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.3
+_RETRY_STATUSES = (500, 502, 503, 504)
+
+# Longest wait for a rate limit to reset. GitHub's quota resets hourly
+DEFAULT_RATE_LIMIT_WAIT = 3600
+_RATE_LIMIT_RETRIES = 5
+_RATE_LIMIT_STATUSES = (403, 429)
+# Wait for rate limits that do not say for how long, e.g. GitHub's
+# secondary rate limits
+_DEFAULT_RETRY_AFTER = 60
+# X-RateLimit-Reset is usually a timestamp, but some servers send the
+# seconds left instead
+_MAX_RESET_DELAY = 365 * 24 * 3600
+
+_VALIDATOR_HEADERS = {
+    'etag': 'If-None-Match',
+    'last-modified': 'If-Modified-Since',
+}
+
+# Faster JSON decoders, used instead of the json module when installed
+_JSON_DECODERS = ['orjson', 'ujson']
+
+
 __WARNED_ABOUT_PLATFORM = False
+__JSON_LOADS = None
 
 
 # for testing purpouses
@@ -24,6 +63,32 @@ def _reset_platform_warning():
     __WARNED_ABOUT_PLATFORM = False
 
 
+# for testing purpouses
+def _reset_json_decoder():
+    global __JSON_LOADS  # pylint: disable=global-statement
+    __JSON_LOADS = None
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES,
+                   backoff=DEFAULT_BACKOFF):
+    '''
+    A `requests.Session` keeping up to `pool_size` connections alive per host.
+
+    Connection errors and 5xx responses are retried up to `retries` times,
+    sleeping `backoff * 2 ** attempt` seconds between them. `Retry-After` is
+    left to the `RateLimiter`, which bounds how long requests wait.
+    '''
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff,
+                  status_forcelist=_RETRY_STATUSES, raise_on_status=False,
+                  respect_retry_after_header=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class NotOkResponse(Exception):
     def __init__(self, message, response):
         super(NotOkResponse, self).__init__(message)
@@ -34,6 +99,156 @@ class NotOkResponse(Exception):
         return self._response
 
 
+class RateLimited(NotOkResponse):
+    ''' A rate limit would take longer than allowed to reset. '''
+
+
+def _int_header(headers, name):
+    try:
+        return int(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _get_reset(headers, now):
+    reset = _int_header(headers, 'X-RateLimit-Reset')
+    if reset is not None and reset < _MAX_RESET_DELAY:
+        return now + reset
+    return reset
+
+
+def _get_retry_after(headers, now):
+    ''' When `Retry-After` (seconds or an HTTP date) allows a new request. '''
+    value = headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return now + float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_tz(value)
+        return None if parsed is None else email.utils.mktime_tz(parsed)
+
+
+class _Quota(object):
+    ''' What is known about the rate limit of a host and credential. '''
+    __slots__ = ('remaining', 'reset', 'blocked_until', 'in_flight',
+                 'response')
+
+    def __init__(self):
+        self.remaining = None
+        self.reset = None
+        self.blocked_until = None
+        self.in_flight = 0
+        self.response = None
+
+    def get_delay(self, now):
+        ''' Seconds until another request fits in the quota. '''
+        if self.blocked_until is not None:
+            if self.blocked_until > now:
+                return self.blocked_until - now
+            self.blocked_until = None
+        if self.reset is not None and self.reset <= now:
+            self.remaining = self.reset = None  # A new window began
+        if (self.remaining is not None and self.reset is not None and
+                self.remaining <= self.in_flight):
+            return self.reset - now
+        return 0
+
+    def update(self, response, now):
+        ''' Learn from `response`, returning whether it was rate limited. '''
+        headers = response.headers
+        remaining = _int_header(headers, 'X-RateLimit-Remaining')
+        reset = _get_reset(headers, now)
+        if remaining is not None:
+            # Concurrent responses arrive out of order
+            if self.remaining is not None and reset == self.reset:
+                remaining = min(remaining, self.remaining)
+            self.remaining, self.reset = remaining, reset
+        if response.status_code not in _RATE_LIMIT_STATUSES:
+            return False
+        retry_after = _get_retry_after(headers, now)
+        if response.status_code == 403 and retry_after is None and \
+                remaining != 0:
+            return False  # Forbidden, not rate limited
+        self.response = response
+        if retry_after is None:
+            retry_after = (reset if remaining == 0 and reset is not None
+                           else now + _DEFAULT_RETRY_AFTER)
+        self.blocked_until = max(retry_after, self.blocked_until or now)
+        return True
+
+
+class RateLimiter(object):
+    '''
+    Schedules requests within the rate limit of each host and credential.
+
+    Quotas are learnt from the `X-RateLimit-Remaining` and
+    `X-RateLimit-Reset` headers. No more requests than the remaining quota
+    run at once, so concurrent fetches slow down as it runs out, and wait
+    for the reset once it does. Rate limited responses (429, or 403 with
+    `Retry-After` or an exhausted quota) pause their host and credential
+    until the reset.
+    '''
+    def __init__(self, max_wait=DEFAULT_RATE_LIMIT_WAIT, clock=time.time):
+        self.max_wait = max_wait
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._quotas = {}
+
+    def acquire(self, key):
+        ''' Wait until a request for `key` fits in its quota. '''
+        with self._condition:
+            quota = self._quotas.setdefault(key, _Quota())
+            warned = False
+            while True:
+                delay = quota.get_delay(self._clock())
+                if delay <= 0:
+                    quota.in_flight += 1
+                    return
+                if delay > self.max_wait:
+                    raise RateLimited(
+                        ("Rate limit for '{}' resets in {:.0f}s, more than "
+                         "the {}s allowed").format(key[0], delay,
+                                                   self.max_wait),
+                        quota.response)
+                if not warned:
+                    print("Rate limit for '{}' reached. Waiting {:.0f}s"
+                          .format(key[0], delay), file=sys.stderr)
+                    warned = True
+                # Woken up early when other responses update the quota
+                self._condition.wait(delay)
+
+    def release(self, key, response=None):
+        '''
+        Account for a finished request and its `response`, if any.
+
+        Returns whether the response was rate limited.
+        '''
+        with self._condition:
+            quota = self._quotas[key]
+            quota.in_flight -= 1
+            limited = (response is not None and
+                       quota.update(response, self._clock()))
+            self._condition.notify_all()
+        return limited
+
+
+_RATE_LIMITER = RateLimiter()
+
+
+def configure_rate_limits(max_wait=DEFAULT_RATE_LIMIT_WAIT):
+    ''' Set the longest wait for rate limits to reset, in seconds. '''
+    _RATE_LIMITER.max_wait = max_wait
+
+
+def _rate_limit_key(url, kwargs):
+    ''' Rate limits apply per host and credential. '''
+    auth = kwargs.get('auth')
+    credential = (auth[0] if isinstance(auth, tuple) else
+                  (kwargs.get('headers') or {}).get('Authorization'))
+    return urlparse(url).netloc, credential
+
+
 def _request(method, url, **kwargs):
     global __WARNED_ABOUT_PLATFORM  # pylint: disable=global-statement
     logger.debug("method: %s, url: %s", method, url)
@@ -55,12 +270,35 @@ def _request(method, url, **kwargs):
 
 
 def request(method, url, user=None, password=None, **kwargs):
+    '''
+    Make a request, raising `NotOkResponse` unless it succeeds.
+
+    Requests are scheduled within the rate limits of their host and
+    credential (see `RateLimiter`), and retried when rate limited.
+    '''
     logger.debug("test")
     logger.info("Requesting: %s:%s", method.__name__, url)
     if user:
         kwargs['auth'] = (user, password)
-    response = _request(method, url, **kwargs)
+    key = _rate_limit_key(url, kwargs)
+    for attempt in range(_RATE_LIMIT_RETRIES + 1):
+        _RATE_LIMITER.acquire(key)
+        response = None
+        try:
+            with timings.timed(timings.HTTP,
+                               name=method.__name__.upper()) as timer:
+                timer.annotate(url=url)
+                response = _request(method, url, **kwargs)
+                timer.add_bytes(len(response.content or b''))
+                timer.annotate(status=response.status_code)
+        finally:
+            limited = _RATE_LIMITER.release(key, response)
+        if not limited or attempt == _RATE_LIMIT_RETRIES:
+            break
+        logger.info("Rate limited requesting '%s', retrying", url)
     logger.debug("Response status code: %s", response.status_code)
+    if response.status_code == NOT_MODIFIED and _is_conditional(kwargs):
+        return response
     if not 200 <= response.status_code < 300:
         used_auth = bool(kwargs.get('auth', None))
         raise NotOkResponse(("Response status code for '{}' was not 2xx: {}. "
@@ -70,10 +308,69 @@ def request(method, url, user=None, password=None, **kwargs):
     return response
 
 
-def get_response_content(response):
+def _is_conditional(kwargs):
+    headers = kwargs.get('headers') or {}
+    conditional = set(h.lower() for h in _VALIDATOR_HEADERS.values())
+    return any(h.lower() in conditional for h in headers)
+
+
+def get_validators(response):
+    ''' Extract the cache validators (ETag, Last-Modified) of a response. '''
+    return {h: response.headers[h] for h in _VALIDATOR_HEADERS
+            if response.headers.get(h)}
+
+
+def get_links(response):
+    ''' Map the relations in the `Link` header of a response to their urls. '''
+    return {rel: link['url'] for rel, link in (response.links or {}).items()}
+
+
+def conditional_headers(validators):
+    ''' Request headers to revalidate content with the given validators. '''
+    return {_VALIDATOR_HEADERS[h]: value
+            for h, value in (validators or {}).items()
+            if h in _VALIDATOR_HEADERS}
+
+
+def _stdlib_json_loads(content):
+    if isinstance(content, bytes):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+
+def _get_json_loads():
+    global __JSON_LOADS  # pylint: disable=global-statement
+    if __JSON_LOADS is None:
+        for name in _JSON_DECODERS:
+            try:
+                __JSON_LOADS = importlib.import_module(name).loads
+            except ImportError:
+                continue
+            logger.debug("Decoding JSON with %s", name)
+            break
+        else:
+            __JSON_LOADS = _stdlib_json_loads
+    return __JSON_LOADS
+
+
+def _parse_html(content):
+    from bs4 import BeautifulSoup  # Slow import, HTML responses are rare
+    return BeautifulSoup(content)
+
+
+def get_response_content(response, parse_html=False):
+    '''
+    Decode a response's body according to its content type.
+
+    JSON is decoded straight from the raw bytes, with orjson or ujson if
+    available. HTML is only parsed (with BeautifulSoup) if `parse_html` is
+    set; other bodies are returned as raw bytes.
+    '''
     content_type = response.headers['content-type']
     if 'application/json' in content_type:
-        return response.json()
-    elif 'text/html' in content_type:
-        return BeautifulSoup(response.content)
+        with timings.timed(timings.DECODE):
+            return _get_json_loads()(response.content)
+    elif parse_html and 'text/html' in content_type:
+        with timings.timed(timings.DECODE):
+            return _parse_html(response.content)
     return response.content
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=protected-access
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_
+
+from .utils import TestCase, config_from_string
+
+from issue2branch.cache import IssueCache
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class IssueCacheTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.clock = FakeClock()
+        self.cache = IssueCache(self.path, ttl=60, max_entries=3,
+                                clock=self.clock)
+
+    def test_missing_key(self):
+        eq_(self.cache.get('missing'), None)
+
+    def test_get_after_set(self):
+        self.cache.set('key', {'id': 1, 'title': 'the_title'})
+        eq_(self.cache.get('key'), {'id': 1, 'title': 'the_title'})
+
+    def test_stale_entry(self):
+        self.cache.set('key', [1, 2, 3])
+        self.clock.now += 61
+        eq_(self.cache.get('key'), None)
+
+    def test_stale_entry_ignoring_ttl(self):
+        self.cache.set('key', [1, 2, 3])
+        self.clock.now += 61
+        eq_(self.cache.get('key', ignore_ttl=True), [1, 2, 3])
+
+    def test_entry_keeps_validators(self):
+        self.cache.set('key', [1, 2, 3], validators={'etag': '"the_etag"'})
+        entry = self.cache.get_entry('key')
+        eq_(entry['content'], [1, 2, 3])
+        eq_(entry['validators'], {'etag': '"the_etag"'})
+
+    def test_revalidate_makes_entry_fresh(self):
+        self.cache.set('key', [1, 2, 3])
+        self.clock.now += 61
+        self.cache.revalidate(self.cache.get_entry('key'))
+        eq_(self.cache.get('key'), [1, 2, 3])
+
+    def test_delete(self):
+        self.cache.set('key', [1, 2, 3])
+        self.cache.delete('key')
+        eq_(self.cache.get('key'), None)
+
+    def test_uncacheable_content_is_skipped(self):
+        self.cache.set('key', object())
+        eq_(self.cache.get('key'), None)
+
+    def test_evicts_least_recently_used(self):
+        for index, key in enumerate(['a', 'b', 'c']):
+            self.cache.set(key, key)
+            os.utime(self.cache._entry_path(key), (index, index))
+        self.cache.get('a')  # Touches 'a', so 'b' is now the oldest
+
+        self.cache.set('d', 'd')
+
+        eq_(self.cache.get('a'), 'a')
+        eq_(self.cache.get('b'), None)
+        eq_(self.cache.get('c'), 'c')
+        eq_(self.cache.get('d'), 'd')
+
+
+class IssueCacheFromConfigTests(TestCase):
+    def test_defaults(self):
+        cache = IssueCache.from_config(config_from_string(''))
+        eq_(cache._ttl, 300)
+        eq_(cache._max_entries, 500)
+
+    def test_config_values(self):
+        cache = IssueCache.from_config(config_from_string('''
+[cache]
+ttl = 10
+max_entries = 20
+path = /the/path
+'''))
+        eq_(cache._ttl, 10)
+        eq_(cache._max_entries, 20)
+        eq_(cache.path, '/the/path')
+
+    def test_zero_ttl_disables_cache(self):
+        eq_(IssueCache.from_config(config_from_string('''
+[cache]
+ttl = 0
+''')), None)
@@ -4,11 +4,14 @@
 from __future__ import absolute_import, unicode_literals
 
 import logging
+import os
+import shutil
+import tempfile
 
 from nose.tools import eq_
 from six.moves.configparser import SafeConfigParser  # pylint: disable=import-error
 
-from .utils.mock import create_autospec, patch, sentinel, Mock
+from .utils.mock import create_autospec, patch, sentinel, Mock, PropertyMock
 from .utils import TestCase, config_from_string
 
 from issue2branch.config import Config, ConfigMissing, get_config, get_config_file
@@ -113,17 +116,123 @@ class GetWithCoerceTest(TestCase):
         mock_coerce.assert_called_once_with('a_value')
 
 
-@patch('issue2branch.config.get_config_file', autospec=True)
-@patch.object(Config, 'from_filename')
-def test_get_config(mock_from_file, mock_get_file):
-    mock_get_file.return_value = sentinel.filename
-    mock_from_file.return_value = sentinel.config
-
-    config = get_config()
-
-    mock_get_file.assert_called_once_with()
-    mock_from_file.assert_called_once_with(sentinel.filename)
-    eq_(config, sentinel.config)
+class GetConfigTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.system_file = self._path('etc', 'issue2branch.config')
+        self.user_file = self._path('home', 'issue2branch', 'config')
+        self.repo_file = self._path('repo', '.issue2branch.config')
+        self.env_file = self._path('env.config')
+        self.patch('issue2branch.config.SYSTEM_CONF_FILE', self.system_file)
+        self.environ = {
+            'XDG_CONFIG_HOME': self._path('home'),
+            'XDG_CACHE_HOME': self._path('cache'),
+        }
+        patcher = patch.dict('os.environ', self.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop('ISSUE2BRANCH_CONFIG', None)
+        self.repository = Mock(path=self._path('repo', 'subdir'),
+                               working_dir=self._path('repo'))
+        self.patch('sys.stderr')
+
+    def _path(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    @staticmethod
+    def _write(fname, contents, mtime=None):
+        directory = os.path.dirname(fname)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(fname, 'w') as fobj:
+            fobj.write(contents)
+        if mtime is not None:
+            os.utime(fname, (mtime, mtime))
+
+    def _get(self, section='main', option='key'):
+        return get_config(self.repository).get(section, option, None)
+
+    def test_no_files(self):
+        eq_(self._get(), None)
+
+    def test_layers(self):
+        self._write(self.system_file, '[main]\nkey = system\nsystem = 1\n')
+        self._write(self.user_file, '[main]\nkey = user\nuser = 1\n')
+        self._write(self.repo_file, '[main]\nkey = repo\nrepo = 1\n')
+        os.environ['ISSUE2BRANCH_CONFIG'] = self.env_file
+        self._write(self.env_file, '[main]\nkey = env\n')
+
+        eq_(self._get(), 'env')
+        for option in ['system', 'user', 'repo']:
+            eq_(self._get(option=option), '1')
+
+    def test_outside_a_repository(self):
+        self.repository = Mock(path=self.path)
+        type(self.repository).working_dir = PropertyMock(
+            side_effect=ValueError('not a repo'))
+        self._write(self.user_file, '[main]\nkey = user\n')
+
+        eq_(self._get(), 'user')
+
+    def test_compiled_config_is_reused(self):
+        self._write(self.repo_file, '[main]\nkey = %(other)s!\nother = a\n')
+        eq_(self._get(), 'a!')
+        mock_parse = self.patch_object(Config, 'from_filenames')
+        repository = self.repository
+        self.repository = Mock(path=repository.path)
+        type(self.repository).working_dir = PropertyMock(
+            side_effect=AssertionError('Repository root was looked up'))
+
+        eq_(self._get(), 'a!')
+        eq_(mock_parse.called, False)
+
+    def test_changed_file_is_reloaded(self):
+        self._write(self.repo_file, '[main]\nkey = old\n', mtime=1000)
+        eq_(self._get(), 'old')
+        self._write(self.repo_file, '[main]\nkey = new\n', mtime=2000)
+
+        eq_(self._get(), 'new')
+
+    def test_new_file_is_loaded(self):
+        eq_(self._get(), None)
+        self._write(self.user_file, '[main]\nkey = user\n')
+
+        eq_(self._get(), 'user')
+
+    def test_new_repository_file_is_loaded(self):
+        eq_(self._get(), None)
+        self._write(self.repo_file, '[main]\nkey = repo\n')
+
+        eq_(self._get(), 'repo')
+
+    def test_not_compiled_outside_a_repository(self):
+        self.repository = Mock(path=self.path)
+        type(self.repository).working_dir = PropertyMock(
+            side_effect=ValueError('not a repo'))
+        eq_(self._get(), None)
+        self.repository = Mock(path=self.path,
+                               working_dir=self._path('repo'))
+        self._write(self.repo_file, '[main]\nkey = repo\n')
+
+        eq_(self._get(), 'repo')
+
+    def test_secrets_are_not_compiled(self):
+        self._write(self.user_file, '[auth]\nuser = me\npassword = s3cr3t\n')
+        eq_(self._get('auth', 'password'), 's3cr3t')
+
+        eq_(os.path.exists(self._path('cache', 'issue2branch', 'config')),
+            False)
+        self._write(self.user_file, '[auth]\nuser = me\npassword = other\n',
+                    mtime=1)
+        eq_(self._get('auth', 'password'), 'other')
+
+    def test_compiled_config_depends_on_environment(self):
+        self._write(self.env_file, '[main]\nkey = env\n')
+        eq_(self._get(), None)
+        os.environ['ISSUE2BRANCH_CONFIG'] = self.env_file
+
+        eq_(self._get(), 'env')
 
 
 class GetConfigFileTests(TestCase):
@@ -144,6 +253,16 @@ class GetConfigFileTests(TestCase):
         self.mock_join.assert_called_once_with(sentinel.git_root, '.issue2branch.config')
         eq_(filename, sentinel.filename)
 
+    def test_uses_given_repository(self):
+        self.mock_os.environ = {}
+        repository = Mock(working_dir=sentinel.repository_root)
+
+        get_config_file(repository)
+
+        eq_(self.mock_git_root.called, False)
+        self.mock_join.assert_called_once_with(sentinel.repository_root,
+                                               '.issue2branch.config')
+
     def test_git_and_environ(self):
         self.mock_os.environ = {'ISSUE2BRANCH_CONFIG': sentinel.environ_filename}
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=protected-access
+from __future__ import absolute_import, unicode_literals
+
+import argparse
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_
+
+from .utils import TestCase, config_from_string
+
+from issue2branch.config import Config
+from issue2branch.daemon import (DaemonClient, DaemonUnavailable, IssueDaemon,
+                                 get_socket_path)
+from issue2branch.issue import Issue
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class FakeTracker(object):
+    scope = 'Fake:scope'
+
+    def __init__(self):
+        self.polled_options = []
+
+    @staticmethod
+    def get_issue_list_url(config, options):  # pylint: disable=unused-argument
+        return 'http://tracker/issues?limit={}'.format(options.limit)
+
+    @staticmethod
+    def get_list_limit(config, options):  # pylint: disable=unused-argument
+        return options.limit
+
+    def iter_issue_pages(self, config, options):  # pylint: disable=unused-argument
+        self.polled_options.append(options)
+        yield [Issue(1, 'One', status='New')]
+        yield [Issue(2, 'Two', parent=1)]
+
+    @staticmethod
+    def get_issue(issue, config, options):  # pylint: disable=unused-argument
+        return Issue(issue, 'Issue {}'.format(issue), description='Details')
+
+
+def _options(**kwargs):
+    return argparse.Namespace(**dict({'limit': 10, 'refresh': False,
+                                      'offline': False}, **kwargs))
+
+
+class GetSocketPathTests(TestCase):
+    def test_per_scope(self):
+        config = config_from_string('')
+        self.assertNotEqual(get_socket_path(config, 'Github:a/b'),
+                            get_socket_path(config, 'Github:a/c'))
+
+    def test_from_config(self):
+        config = Config.from_sections({'daemon': {'socket': '/some/path'}})
+        eq_(get_socket_path(config, 'scope'), '/some/path')
+
+
+class IssueDaemonTests(TestCase):
+    def setUp(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise SkipTest("Unix sockets are not available")
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.config = Config.from_sections({
+            'daemon': {'socket': os.path.join(self.path, 'daemon.sock')},
+        })
+        self.tracker = FakeTracker()
+        self.options = _options()
+        self.daemon = IssueDaemon.from_config(self.tracker, self.config,
+                                              self.options)
+
+    def _start(self):
+        thread = threading.Thread(target=self.daemon.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.daemon.shutdown)
+        self.assertTrue(self.daemon.ready.wait(5))
+        return DaemonClient.from_config(self.config, self.tracker.scope)
+
+    def test_poll_revalidates(self):
+        self.daemon.poll()
+        polled, = self.tracker.polled_options
+        eq_(polled.refresh, True)
+        eq_(polled.limit, 10)
+
+    def test_handle_other_scope(self):
+        reply = self.daemon.handle({'scope': 'Other:scope',
+                                    'method': 'get_issue', 'issue': '1'})
+        self.assertIn('error', reply)
+
+    def test_handle_list_before_poll(self):
+        reply = self.daemon.handle({
+            'scope': self.tracker.scope, 'method': 'get_issue_list',
+            'list': ['http://tracker/issues?limit=10', 10]})
+        self.assertIn('error', reply)
+
+    def test_no_client_without_daemon(self):
+        eq_(DaemonClient.from_config(self.config, self.tracker.scope), None)
+
+    def test_get_issue_list(self):
+        client = self._start()
+        self.daemon.poll()
+
+        issues = client.get_issue_list(self.tracker, self.config, self.options)
+
+        eq_([i.issue_id for i in issues], [1, 2])
+        eq_(issues[0].status, 'New')
+        eq_(issues[1].parent, 1)
+
+    def test_other_list_is_not_served(self):
+        client = self._start()
+        self.daemon.poll()
+
+        self.assertRaises(DaemonUnavailable, client.get_issue_list,
+                          self.tracker, self.config, _options(limit=20))
+
+    def test_get_issue(self):
+        client = self._start()
+
+        issue = client.get_issue(self.tracker, '123')
+
+        eq_(issue.issue_id, '123')
+        eq_(issue.description, 'Details')
+
+    def test_stale_socket_is_replaced(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.daemon.path)
+        sock.close()
+
+        client = self._start()
+
+        eq_(client.get_issue(self.tracker, '1').title, 'Issue 1')
+
+    def test_only_one_daemon(self):
+        self._start()
+        other = IssueDaemon.from_config(self.tracker, self.config,
+                                        self.options)
+
+        self.assertRaises(ValueError, other.serve_forever)
+        self.assertTrue(os.path.exists(self.daemon.path))
+
+    def test_unreachable_daemon(self):
+        client = DaemonClient(os.path.join(self.path, 'missing.sock'))
+        self.assertRaises(DaemonUnavailable, client.get_issue, self.tracker,
+                          '1')
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=protected-access
+from __future__ import absolute_import, unicode_literals
+
+import logging
+
+from nose.tools import eq_
+
+from .utils import TestCase, config_from_string
+from .utils.mock import Mock
+
+from issue2branch import format as fmt
+from issue2branch.format import colorize, configure_colors, paint
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+def _tty(isatty=True):
+    return Mock(isatty=Mock(return_value=isatty))
+
+
+class ColorizeTests(TestCase):
+    def setUp(self):
+        self.patch_object(fmt, '_table', fmt._build_table())
+        self.patch_object(fmt, '_enabled', True)
+        self.mock_environ = self.patch('issue2branch.format.os.environ', {})
+
+    def _configure(self, config='', stream=None):
+        configure_colors(config_from_string(config), stream or _tty())
+
+    def test_default_colors(self):
+        eq_(colorize('Bug'), '\033[31m\033[1mBug\033[0m')
+        eq_(colorize('Urgent'), '\033[31mUrgent\033[0m')
+        eq_(colorize('In progress'), '\033[36m\033[1mIn progress\033[0m')
+
+    def test_label(self):
+        eq_(colorize(' Bug: ', 'bug'), '\033[31m\033[1m Bug: \033[0m')
+
+    def test_unknown_label(self):
+        eq_(colorize('Unknown'), 'Unknown')
+        eq_(colorize('Unknown'), 'Unknown')
+        self.assertNotIn('Unknown', fmt._table)
+
+    def test_label_case_is_memoized(self):
+        eq_(colorize('BUG'), '\033[31m\033[1mBUG\033[0m')
+        self.assertIn('BUG', fmt._table)
+
+    def test_config_overrides(self):
+        self._configure('[colors]\nbug = blue\nnew = none\nblocked = red\n')
+        eq_(colorize('Bug'), '\033[34mBug\033[0m')
+        eq_(colorize('New'), 'New')
+        eq_(colorize('Blocked'), '\033[31mBlocked\033[0m')
+
+    def test_invalid_color(self):
+        self.assertRaises(ValueError, self._configure, '[colors]\nbug = pink\n')
+
+    def test_non_tty_disables_colors(self):
+        self._configure(stream=_tty(False))
+        eq_(colorize('Bug'), 'Bug')
+        eq_(paint('text', 'green'), 'text')
+
+    def test_no_color_disables_colors(self):
+        self.mock_environ['NO_COLOR'] = '1'
+        self._configure()
+        eq_(colorize('Bug'), 'Bug')
+
+    def test_always(self):
+        self._configure('[output]\ncolor = always\n', stream=_tty(False))
+        eq_(colorize('Bug'), '\033[31m\033[1mBug\033[0m')
+
+    def test_never(self):
+        self._configure('[output]\ncolor = never\n')
+        eq_(colorize('Bug'), 'Bug')
+
+    def test_invalid_mode(self):
+        self.assertRaises(ValueError, self._configure,
+                          '[output]\ncolor = sometimes\n')
+
+    def test_paint(self):
+        eq_(paint('text', 'green'), '\033[32mtext\033[0m')
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Startup regression tests, checking which modules get imported. Each one runs
+in a fresh interpreter. Import times are measured by benchmarks/.
+'''
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import os
+import subprocess
+import sys
+
+from nose.tools import eq_
+
+from .utils import TestCase
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SLOW_MODULES = ['git', 'bs4', 'requests']
+
+
+def _run_python(*args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [_ROOT_DIR] + [p for p in [env.get('PYTHONPATH')] if p])
+    process = subprocess.Popen([sys.executable] + list(args), env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    eq_(process.returncode, 0, stderr)
+    return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+
+def _imported_modules(statement):
+    stdout, _stderr = _run_python(
+        '-c', "import sys\n{}\nprint('\\n'.join(sys.modules))".format(statement))
+    return set(stdout.split())
+
+
+class LazyImportTests(TestCase):
+    def test_package_import_is_lazy(self):
+        modules = _imported_modules('import issue2branch')
+        for module in _SLOW_MODULES + ['issue2branch.trackers.base',
+                                       'issue2branch.profiling',
+                                       'issue2branch.tracing']:
+            self.assertNotIn(module, modules)
+
+    def test_only_selected_tracker_is_imported(self):
+        modules = _imported_modules(
+            'from issue2branch.trackers import get_issue_tracker_class\n'
+            'get_issue_tracker_class("redmine")')
+        self.assertIn('issue2branch.trackers.redmine', modules)
+        self.assertNotIn('issue2branch.trackers.github', modules)
+        self.assertNotIn('issue2branch.trackers.bitbucket', modules)
+        self.assertNotIn('bs4', modules)
+        self.assertNotIn('git', modules)
+
+
+class LazyTrackerImportTests(TestCase):
+    ''' Optional features are only imported when used. '''
+    _LAZY_MODULES = ['issue2branch.index', 'sqlite3', 'issue2branch.daemon',
+                     'socketserver', 'multiprocessing.pool',
+                     'issue2branch.profiling', 'issue2branch.tracing']
+
+    def test_tracker_import_is_lazy(self):
+        modules = _imported_modules('import issue2branch.trackers.redmine')
+        for module in self._LAZY_MODULES:
+            self.assertNotIn(module, modules)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=protected-access
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_
+
+from .utils import TestCase, config_from_string
+
+from issue2branch.index import IssueIndex
+from issue2branch.issue import Issue
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class IssueIndexTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.index = IssueIndex(os.path.join(self.path, 'sub', 'index.sqlite'))
+        self.addCleanup(self.index.close)
+        self.index.update('scope', [
+            Issue(1, 'Login timeout is too short', status='New'),
+            Issue(2, 'Crash on logout', description='Happens after a timeout',
+                  assignee='someone'),
+            Issue(3, 'Update README', tag='Documentation'),
+        ])
+
+    def _search(self, query, scope='scope', **kwargs):
+        return [i.issue_id for i in self.index.search(scope, query, **kwargs)]
+
+    def test_search_title(self):
+        eq_(self._search('readme'), [3])
+
+    def test_search_description(self):
+        eq_(sorted(self._search('timeout')), [1, 2])
+
+    def test_all_words_must_match(self):
+        eq_(self._search('login timeout'), [1])
+
+    def test_prefix_match(self):
+        eq_(sorted(self._search('log')), [1, 2])
+
+    def test_search_other_fields(self):
+        eq_(self._search('documentation'), [3])
+        eq_(self._search('someone'), [2])
+        eq_(self._search('new'), [1])
+
+    def test_symbols_are_ignored(self):
+        eq_(self._search('"login" -timeout*'), [1])
+
+    def test_empty_query(self):
+        eq_(self._search(' ?! '), [])
+
+    def test_limit(self):
+        eq_(len(self._search('timeout', limit=1)), 1)
+
+    def test_scopes_are_separated(self):
+        eq_(self._search('readme', scope='other_scope'), [])
+
+    def test_results_are_issues(self):
+        issue, = self.index.search('scope', 'login')
+        eq_(issue.title, 'Login timeout is too short')
+        eq_(issue.status, 'New')
+
+    def test_update_replaces_issue(self):
+        self.index.update('scope', [Issue(3, 'Update CHANGELOG')])
+
+        eq_(self._search('readme'), [])
+        eq_(self._search('changelog'), [3])
+        eq_(len(self.index), 3)
+
+    def test_index_persists(self):
+        self.index.close()
+        eq_(self._search('readme'), [3])
+
+    def test_last_sync_default(self):
+        eq_(self.index.get_last_sync('scope'), None)
+
+    def test_last_sync(self):
+        self.index.set_last_sync('scope', '2015-01-02T03:04:05Z')
+        self.index.set_last_sync('other_scope', '2014-01-02T03:04:05Z')
+        self.index.set_last_sync('scope', '2015-06-02T03:04:05Z')
+
+        eq_(self.index.get_last_sync('scope'), '2015-06-02T03:04:05Z')
+        eq_(self.index.get_last_sync('other_scope'), '2014-01-02T03:04:05Z')
+
+
+class IssueIndexFromConfigTests(TestCase):
+    def test_path_from_config(self):
+        index = IssueIndex.from_config(config_from_string('''
+[index]
+path = /the/index.sqlite
+'''))
+        eq_(index._path, '/the/index.sqlite')
+
+    def test_default_path(self):
+        index = IssueIndex.from_config(config_from_string(''))
+        eq_(os.path.basename(index._path), 'index.sqlite')
+
+
+class TryUpdateTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.mock_warning = self.patch('issue2branch.index.logger.warning')
+
+    def test_updates(self):
+        with IssueIndex(os.path.join(self.path, 'index.sqlite')) as index:
+            index.try_update('scope', [Issue(1, 'one')])
+            eq_(len(index), 1)
+
+    def test_errors_are_logged_once(self):
+        # A directory where the database should be
+        with IssueIndex(self.path) as index:
+            index.try_update('scope', [Issue(1, 'one')])
+            index.try_update('scope', [Issue(2, 'two')])
+        eq_(self.mock_warning.call_count, 1)
+
+    def test_unwritable_directory(self):
+        blocker = os.path.join(self.path, 'blocker')
+        open(blocker, 'w').close()
+        with IssueIndex(os.path.join(blocker, 'index.sqlite')) as index:
+            index.try_update('scope', [Issue(1, 'one')])
+        eq_(self.mock_warning.call_count, 1)
@@ -8,7 +8,7 @@ from nose.tools import eq_
 
 from .utils import TestCase
 
-from issue2branch.issue import Issue
+from issue2branch.issue import Issue, IssueTree
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -51,6 +51,79 @@ class TextTests(TestCase):
         eq_(self.issue.text(),
             'the_issue_id -\033[35m {the_project}\033[0mcolorize( Issue: ,Issue)the_issue_title')
 
+    def test_non_string_fields_text(self):
+        self.issue.project = 7
+        self.issue.assignee = 8
+        eq_(self.issue.text(),
+            'the_issue_id -\033[35m {7}\033[0mcolorize( Issue: ,Issue)the_issue_title - \033[32m(8)\033[0m')
+
+def test_issue_dict_roundtrip():
+    issue = Issue('the_id', 'the_title', tag='the_tag', parent='the_parent',
+                  priority='the_priority', status='the_status',
+                  assignee='the_assignee', project='the_project',
+                  description='the_description')
+    copy = Issue.from_dict(issue.to_dict())
+    for field in Issue.FIELDS:
+        eq_(getattr(copy, field), getattr(issue, field))
+
+
+def test_issue_to_dict_default_tag():
+    eq_(Issue('the_id', 'the_title').to_dict()['tag'], 'Issue')
+
+
 def test_issue_branch():
     issue = Issue('the_id', 'the_title', tag='the_tag')
     eq_(issue.branch(), 'the_tag-the_id-the_title')
+
+
+def test_issue_is_slotted():
+    issue = Issue('the_id', 'the_title')
+    eq_(hasattr(issue, '__dict__'), False)
+
+
+def test_leaf_issue_has_no_childs():
+    issue = Issue('the_id', 'the_title')
+    eq_(issue.childs, {})
+    eq_(issue._childs, None)  # pylint: disable=protected-access
+
+
+def test_childs_can_be_written():
+    parent = Issue(1, 'parent')
+    child = Issue(2, 'child')
+    parent.childs[2] = child
+    eq_(parent.childs, {2: child})
+    parent.childs.setdefault(3, child)
+    eq_(sorted(parent.childs), [2, 3])
+
+
+def test_add_child():
+    parent, child = Issue(1, 'parent'), Issue(2, 'child', parent=1)
+    parent.add_child(child)
+    eq_(parent.childs, {2: child})
+
+
+class IssueTreeTests(TestCase):
+    def test_issues_without_parent_are_roots(self):
+        tree = IssueTree()
+        tree.extend([Issue(1, 'one'), Issue(2, 'two')])
+        eq_(sorted(tree.roots), [1, 2])
+        eq_(len(tree), 2)
+
+    def test_child_after_parent(self):
+        tree = IssueTree()
+        parent, child = Issue(1, 'parent'), Issue(2, 'child', parent=1)
+        tree.extend([parent, child])
+        eq_(list(tree.roots), [1])
+        eq_(parent.childs, {2: child})
+
+    def test_child_before_parent(self):
+        tree = IssueTree()
+        parent, child = Issue(1, 'parent'), Issue(2, 'child', parent=1)
+        tree.extend([child, parent])
+        eq_(list(tree.roots), [1])
+        eq_(parent.childs, {2: child})
+
+    def test_missing_parent_is_root(self):
+        tree = IssueTree()
+        tree.add(Issue(2, 'child', parent=1))
+        eq_(list(tree.roots), [2])
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals, print_function
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from nose.tools import eq_
+from six import StringIO
+
+from .utils import TestCase, config_from_string
+from .utils.mock import Mock
+
+from issue2branch.issue import Issue
+from issue2branch.output import (BufferedOutput, PagedOutput,
+                                 get_issue_writer, open_output)
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class IssueWriterTests(TestCase):
+    def setUp(self):
+        self.stream = StringIO()
+        self.issues = [
+            Issue(1, 'One', status='New'),
+            Issue(2, 'Two\tlines', parent=1, description='a\nb\\c'),
+        ]
+
+    def _write(self, fmt, issues=None, **kwargs):
+        with get_issue_writer(fmt, stream=self.stream, **kwargs) as writer:
+            for issue in self.issues if issues is None else issues:
+                writer.write(issue, depth=issue.parent and 1 or 0)
+        return self.stream.getvalue()
+
+    def test_text(self):
+        self.patch('issue2branch.issue.colorize', side_effect=lambda t, *a: t)
+        lines = self._write('text').splitlines()
+        eq_(lines[0], ' * 1 - [New] - Issue: One')
+        eq_(lines[1], '   * 2 - Issue: Two\tlines')
+
+    def test_json(self):
+        data = json.loads(self._write('json'))
+        eq_([d['issue_id'] for d in data], [1, 2])
+        eq_(data[1]['description'], 'a\nb\\c')
+        eq_(data[1]['parent'], 1)
+
+    def test_json_empty(self):
+        eq_(json.loads(self._write('json', issues=[])), [])
+
+    def test_json_single(self):
+        data = json.loads(self._write('json', issues=self.issues[:1],
+                                      many=False))
+        eq_(data['title'], 'One')
+
+    def test_jsonl(self):
+        lines = self._write('jsonl').splitlines()
+        eq_([json.loads(line)['title'] for line in lines],
+            ['One', 'Two\tlines'])
+
+    def test_tsv(self):
+        lines = self._write('tsv').splitlines()
+        eq_(lines[0].split('\t'), list(Issue.FIELDS))
+        eq_(lines[1].split('\t'),
+            ['1', 'One', 'Issue', '', '', 'New', '', '', ''])
+        eq_(lines[2].split('\t'),
+            ['2', 'Two\\tlines', 'Issue', '1', '', '', '', '', 'a\\nb\\\\c'])
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, get_issue_writer, 'xml')
+
+
+class CountingStream(object):
+    def __init__(self, isatty=False):
+        self.writes = []
+        self.isatty = Mock(return_value=isatty)
+        self.encoding = 'utf-8'
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return "".join(self.writes)
+
+
+class BufferedOutputTests(TestCase):
+    def setUp(self):
+        self.stream = CountingStream()
+
+    def test_writes_once(self):
+        with BufferedOutput(self.stream) as out:
+            for line in range(1000):
+                print(line, file=out)
+        eq_(len(self.stream.writes), 1)
+        eq_(self.stream.getvalue().splitlines()[-1], '999')
+
+    def test_flush(self):
+        out = BufferedOutput(self.stream)
+        out.write('first\n')
+        eq_(self.stream.writes, [])
+        out.flush()
+        eq_(self.stream.writes, ['first\n'])
+
+    def test_buffer_size(self):
+        out = BufferedOutput(self.stream, buffer_size=10)
+        out.write('12345')
+        out.write('67890')
+        out.write('1')
+        eq_(self.stream.writes, ['1234567890'])
+
+
+class PagedOutputTests(TestCase):
+    def setUp(self):
+        self.stream = CountingStream(isatty=True)
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.paged = os.path.join(self.path, 'paged')
+        self.pager = '"{}" -c "import sys; open(sys.argv[1], \'wb\').write(' \
+            'sys.stdin.buffer.read() if hasattr(sys.stdin, \'buffer\') ' \
+            'else sys.stdin.read())" "{}"'.format(sys.executable, self.paged)
+
+    def _write(self, lines, height=10):
+        with PagedOutput(self.stream, self.pager, height) as out:
+            for line in range(lines):
+                print("línea {}".format(line), file=out)
+                out.flush()
+
+    def test_short_output_is_not_paged(self):
+        self._write(5)
+        eq_(len(self.stream.writes), 1)
+        eq_(os.path.exists(self.paged), False)
+
+    def test_long_output_is_paged(self):
+        self._write(20)
+        eq_(self.stream.writes, [])
+        with open(self.paged, 'rb') as fobj:
+            lines = fobj.read().decode('utf-8').splitlines()
+        eq_(lines[0], 'línea 0')
+        eq_(len(lines), 20)
+
+    def test_missing_pager(self):
+        self.pager = os.path.join(self.path, 'missing_pager')
+        self._write(20)
+        eq_(len(self.stream.getvalue().splitlines()), 20)
+
+
+class OpenOutputTests(TestCase):
+    def test_terminal_is_paged(self):
+        out = open_output(config_from_string(''), stream=CountingStream(True))
+        eq_(type(out), PagedOutput)
+
+    def test_pipe_is_not_paged(self):
+        out = open_output(config_from_string(''), stream=CountingStream(False))
+        eq_(type(out), BufferedOutput)
+
+    def test_machine_formats_are_not_paged(self):
+        out = open_output(config_from_string(''), fmt='jsonl',
+                          stream=CountingStream(True))
+        eq_(type(out), BufferedOutput)
+
+    def test_pager_disabled(self):
+        config = config_from_string('[output]\npager =\n')
+        out = open_output(config, stream=CountingStream(True))
+        eq_(type(out), BufferedOutput)
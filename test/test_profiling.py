@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import io
+import logging
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+
+from nose.plugins.skip import SkipTest
+from nose.tools import eq_
+
+from .utils import TestCase
+
+from issue2branch.profiling import get_profile_options, profiled
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+def _profiled_function():
+    return [list(range(100)) for _ in range(100)]
+
+
+class GetProfileOptionsTests(TestCase):
+    def test_disabled(self):
+        eq_(get_profile_options(['123', '--list'], environ={}), (None, None))
+
+    def test_flag(self):
+        eq_(get_profile_options(['--list', '--profile', 'cpu'], environ={}),
+            ('cpu', 'issue2branch.pstats'))
+
+    def test_environ(self):
+        eq_(get_profile_options([], environ={'ISSUE2BRANCH_PROFILE': 'mem'}),
+            ('mem', 'issue2branch-mem.txt'))
+
+    def test_flag_overrides_environ(self):
+        environ = {'ISSUE2BRANCH_PROFILE': 'mem',
+                   'ISSUE2BRANCH_PROFILE_OUTPUT': 'env.out'}
+        eq_(get_profile_options(['--profile', 'cpu', '--profile-output',
+                                 'flag.out'], environ=environ),
+            ('cpu', 'flag.out'))
+
+    def test_output_from_environ(self):
+        environ = {'ISSUE2BRANCH_PROFILE_OUTPUT': 'env.out'}
+        eq_(get_profile_options(['--profile', 'cpu'], environ=environ),
+            ('cpu', 'env.out'))
+
+    def test_invalid_environ(self):
+        self.assertRaises(ValueError, get_profile_options, [],
+                          environ={'ISSUE2BRANCH_PROFILE': 'gpu'})
+
+
+class ProfiledTests(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.patch('sys.stderr')
+
+    def test_cpu(self):
+        output = os.path.join(self.path, 'out.pstats')
+        with profiled('cpu', output):
+            _profiled_function()
+
+        stats = pstats.Stats(output)
+        self.assertTrue(any(func[2] == '_profiled_function'
+                            for func in stats.stats))
+
+    def test_memory(self):
+        if sys.version_info < (3, 4):
+            raise SkipTest("tracemalloc needs python 3.4+")
+        output = os.path.join(self.path, 'out.txt')
+        with profiled('mem', output):
+            data = _profiled_function()
+
+        with io.open(output, encoding='utf-8') as fobj:
+            report = fobj.read()
+        self.assertIn('Top 30 allocations', report)
+        self.assertIn('test_profiling.py', report)
+        eq_(len(data), 100)
+
+    def test_invalid_mode(self):
+        def run():
+            with profiled('gpu', 'output'):
+                pass
+        self.assertRaises(ValueError, run)
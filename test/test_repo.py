@@ -8,8 +8,15 @@ import logging
 from unittest import TestCase
 
 from nose.tools import eq_
+import git
 
-from issue2branch.repo import parse_remote_url, get_branch_name
+from issue2branch.repo import (
+    parse_remote_url, get_branch_name, get_branch_names, get_repository,
+    GitRepository)
+from issue2branch.issue import Issue
+
+from .utils import TestCase as PatchingTestCase
+from .utils.mock import Mock
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -56,3 +63,116 @@ class GetBranchNameTest(TestCase):
         self._test(
             'a:.,:;\'"?!\\/()[]{}b',
             'a-b')
+
+    def test_accents_are_transliterated(self):
+        self._test('Añadir café a la canción', 'anadir-cafe-a-la-cancion')
+
+    def test_letters_without_decomposition_are_transliterated(self):
+        self._test('Straße Ærø Łódź', 'strasse-aero-lodz')
+
+    def test_cyrillic_is_transliterated(self):
+        self._test('Журнал ошибок', 'zhurnal-oshibok')
+        self._test('Йогурт щётка', 'iogurt-shchetka')
+
+    def test_untransliterable_are_deleted(self):
+        self._test('Fix \u2603 crash', 'fix-crash')
+
+    def test_max_length_cuts_at_word_boundary(self):
+        eq_(get_branch_name('Issue 3: test get branch name', max_length=20),
+            'issue-3-test-get')
+
+    def test_max_length_exact_word(self):
+        eq_(get_branch_name('Issue 3: test get branch name', max_length=16),
+            'issue-3-test-get')
+
+    def test_max_length_long_word(self):
+        eq_(get_branch_name('Supercalifragilistic', max_length=5), 'super')
+
+    def test_max_length_short_name(self):
+        eq_(get_branch_name('Issue 3', max_length=20), 'issue-3')
+
+
+class GetBranchNamesTest(TestCase):
+    def test_branch_names(self):
+        issues = [Issue(1, 'First one'), Issue(2, 'Café', tag='Bug')]
+        eq_(get_branch_names(issues), ['issue-1-first-one', 'bug-2-cafe'])
+
+    def test_max_length(self):
+        issues = [Issue(1, 'First one'), Issue(2, 'Second', tag='Bug')]
+        eq_(get_branch_names(issues, max_length=13),
+            ['issue-1-first', 'bug-2-second'])
+
+    def test_many_names(self):
+        issues = [Issue(i, 'Añadir soporte para la feature número {}'.format(i),
+                        tag='Feature')
+                  for i in range(1000)]
+        names = get_branch_names(issues, max_length=40)
+        eq_(len(names), 1000)
+        eq_(names[7], 'feature-7-anadir-soporte-para-la-feature')
+
+
+class GitRepositoryTest(PatchingTestCase):
+    def setUp(self):
+        self.repo = Mock()
+        self.existing = Mock()
+        self.existing.name = 'existing'
+        self.repo.heads = [self.existing]
+        self.repository = GitRepository(repo=self.repo)
+
+    def test_repo_is_discovered_once(self):
+        mock_repo_class = self.patch('git.Repo')
+        repository = GitRepository('the_path')
+
+        eq_(repository.repo, mock_repo_class.return_value)
+        eq_(repository.repo, mock_repo_class.return_value)
+        mock_repo_class.assert_called_once_with('the_path',
+                                                search_parent_directories=True)
+
+    def test_not_a_repo(self):
+        mock_repo_class = self.patch('git.Repo')
+        mock_repo_class.side_effect = git.exc.InvalidGitRepositoryError()
+        repository = GitRepository('the_path')
+
+        self.assertRaisesRegexp(ValueError, 'does not belong to a git repository',
+                                getattr, repository, 'repo')
+
+    def test_remotes_are_cached(self):
+        remote = Mock(url='the_url')
+        remote.name = 'origin'
+        self.repo.remotes = [remote]
+
+        eq_(self.repository.get_remotes(), {'origin': 'the_url'})
+        self.repo.remotes = []
+        eq_(self.repository.get_remotes(), {'origin': 'the_url'})
+
+    def test_branch_and_move_existing(self):
+        self.repository.branch_and_move('existing')
+
+        self.existing.checkout.assert_called_once_with()
+        eq_(self.repo.create_head.called, False)
+
+    def test_branch_and_move_new(self):
+        self.repository.branch_and_move('new')
+
+        self.repo.create_head.assert_called_once_with('new')
+        self.repo.create_head.return_value.checkout.assert_called_once_with()
+
+    def test_create_branches(self):
+        created = self.repository.create_branches(['one', 'existing', 'two'])
+
+        eq_(created, ['one', 'two'])
+        eq_([c[0][0] for c in self.repo.create_head.call_args_list],
+            ['one', 'two'])
+
+    def test_create_branches_does_not_checkout(self):
+        self.repository.create_branches(['one'])
+        eq_(self.repo.create_head.return_value.checkout.called, False)
+
+    def test_created_branches_are_known(self):
+        self.repository.create_branches(['one'])
+        eq_(self.repository.create_branches(['one']), [])
+        self.repo.create_head.assert_called_once_with('one')
+
+
+def test_get_repository_is_shared():
+    eq_(get_repository(), get_repository())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_
+
+from .utils import TestCase
+from .utils.mock import Mock
+
+from issue2branch import timings
+from issue2branch.timings import Timings, get_timing_options, report, timed
+from issue2branch.utils.requests import get_response_content, request
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class GetTimingOptionsTests(TestCase):
+    def test_disabled(self):
+        eq_(get_timing_options(['123', '--list']), (False, None))
+
+    def test_flag(self):
+        eq_(get_timing_options(['--list', '--timings']), (True, None))
+
+    def test_file(self):
+        eq_(get_timing_options(['--timings-file', 'm.jsonl']),
+            (True, 'm.jsonl'))
+
+
+class TimedTests(TestCase):
+    def setUp(self):
+        self.addCleanup(timings.disable)
+
+    def test_disabled(self):
+        timings.disable()
+        with timed('http') as timer:
+            timer.add_bytes(10)
+        eq_(timings.get_timings(), None)
+
+    def test_records(self):
+        recorded = timings.enable()
+        for nbytes in [10, 20]:
+            with timed('http') as timer:
+                timer.add_bytes(nbytes)
+        with timed('parse'):
+            pass
+        phases = dict(recorded.phases())
+        eq_(phases['http']['count'], 2)
+        eq_(phases['http']['bytes'], 30)
+        eq_(phases['parse']['count'], 1)
+
+    def test_records_failures(self):
+        recorded = timings.enable()
+
+        def fail():
+            with timed('http'):
+                raise ValueError()
+        self.assertRaises(ValueError, fail)
+        eq_(dict(recorded.phases())['http']['count'], 1)
+
+    def test_phase_order(self):
+        recorded = Timings()
+        for phase in ['git', 'custom', 'config', 'http']:
+            recorded.add(phase, 0.1)
+        eq_([phase for phase, _ in recorded.phases()],
+            ['config', 'http', 'git', 'custom'])
+
+    def test_request(self):
+        recorded = timings.enable()
+        response = Mock(status_code=200, content=b'{"a": 1}',
+                        headers={'content-type': 'application/json'})
+        method = Mock(return_value=response, __name__='get')
+        get_response_content(request(method, 'url'))
+        phases = dict(recorded.phases())
+        eq_(phases['http']['bytes'], 8)
+        eq_(phases['decode']['count'], 1)
+
+
+class ReportTests(TestCase):
+    def setUp(self):
+        self.timings = Timings()
+        self.timings.add('config', 0.5)
+        self.timings.add('http', 1.25, nbytes=1024)
+
+    def test_summary(self):
+        mock_stderr = self.patch('sys.stderr')
+        report(self.timings)
+        summary = "".join(c[0][0] for c in mock_stderr.write.call_args_list)
+        lines = summary.splitlines()
+        eq_(lines[0].split(), ['Phase', 'Calls', 'Seconds', 'Bytes'])
+        eq_(lines[1].split(), ['config', '1', '0.5000', '-'])
+        eq_(lines[2].split(), ['http', '1', '1.2500', '1024'])
+        eq_(lines[3].split()[0], 'total')
+
+    def test_file(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        filename = os.path.join(path, 'metrics.jsonl')
+        report(self.timings, filename, argv=['--list'])
+        report(self.timings, filename, argv=['12'])
+
+        with io.open(filename, encoding='utf-8') as fobj:
+            records = [json.loads(line) for line in fobj]
+        eq_([r['argv'] for r in records], [['--list'], ['12']])
+        eq_(records[0]['phases']['http'],
+            {'seconds': 1.25, 'count': 1, 'bytes': 1024})
+        self.assertTrue(records[0]['total'] > 0)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from nose.tools import eq_
+
+from .utils import TestCase
+
+from issue2branch import timings, tracing
+from issue2branch.timings import time_git_commands, timed
+from issue2branch.tracing import Trace, get_trace_output
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class GetTraceOutputTests(TestCase):
+    def test_disabled(self):
+        eq_(get_trace_output(['123', '--list']), None)
+
+    def test_flag(self):
+        eq_(get_trace_output(['--list', '--trace', 'out.json']), 'out.json')
+
+
+class TraceTests(TestCase):
+    def setUp(self):
+        self.addCleanup(timings.disable)
+        self.trace = tracing.enable()
+
+    def _events(self, phase=None):
+        return [e for e in self.trace.to_dict()['traceEvents']
+                if e['ph'] == 'X' and phase in [None, e['cat']]]
+
+    def test_span(self):
+        with timed('http', name='GET') as timer:
+            timer.annotate(url='http://example.com')
+            timer.add_bytes(10)
+        event, = self._events()
+        eq_(event['name'], 'GET')
+        eq_(event['cat'], 'http')
+        eq_(event['args'], {'url': 'http://example.com', 'bytes': 10})
+        eq_(event['tid'], threading.current_thread().ident)
+        self.assertTrue(event['ts'] >= 0)
+        self.assertTrue(event['dur'] >= 0)
+
+    def test_name_defaults_to_phase(self):
+        with timed('parse'):
+            pass
+        eq_(self._events()[0]['name'], 'parse')
+
+    def test_threads(self):
+        release = threading.Event()
+
+        def work():
+            with timed('http'):
+                pass
+            release.wait()  # Thread ids are reused once a thread ends
+        threads = [threading.Thread(target=work, name='worker-{}'.format(i))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        eq_(len(set(e['tid'] for e in self._events())), 3)
+        names = [e['args']['name'] for e in self.trace.to_dict()['traceEvents']
+                 if e['ph'] == 'M']
+        eq_(sorted(names), ['worker-0', 'worker-1', 'worker-2'])
+
+    def test_along_timings(self):
+        recorded = timings.enable()
+        with timed('render'):
+            pass
+        eq_(len(self._events('render')), 1)
+        eq_(dict(recorded.phases())['render']['count'], 1)
+
+    def test_git_commands(self):
+        from git.cmd import Git
+        self.patch_object(Git, 'execute', Git.execute)
+        time_git_commands()
+        time_git_commands()  # Only wraps once
+
+        Git().version()
+        event, = self._events('git-command')
+        eq_(event['name'], 'git version')
+        eq_(event['args']['command'], 'git version')
+
+    def test_save(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        filename = os.path.join(path, 'trace.json')
+        with timed('parse'):
+            pass
+        self.trace.save(filename)
+
+        with io.open(filename, encoding='utf-8') as fobj:
+            data = json.load(fobj)
+        eq_([e['name'] for e in data['traceEvents']],
+            ['parse', 'thread_name'])
+
+    def test_started(self):
+        trace = Trace(started=0)
+        trace.record('http', 2.5, 0.5)
+        event, = trace.to_dict()['traceEvents'][:1]
+        eq_((event['ts'], event['dur']), (2500000, 500000))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=protected-access
+from __future__ import absolute_import, unicode_literals
+
+import logging
+import threading
+
+from nose.tools import eq_
+
+from issue2branch.trackers.asynchronous import AsyncIssueTracker, wait_all
+from issue2branch.trackers.base import IssueTracker
+
+from ..utils import TestCase
+from ..utils.mock import create_autospec, sentinel
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class AsyncIssueTrackerTests(TestCase):
+    def setUp(self):
+        self.tracker = create_autospec(IssueTracker, instance=True)
+        self.tracker.workers = 3
+        self.async_tracker = AsyncIssueTracker(self.tracker)
+        self.addCleanup(self.async_tracker.close)
+
+    def test_get_issue(self):
+        self.tracker.get_issue.return_value = sentinel.issue
+
+        result = self.async_tracker.get_issue(sentinel.issue_id,
+                                              sentinel.config, sentinel.options)
+
+        eq_(result.get(), sentinel.issue)
+        self.tracker.get_issue.assert_called_once_with(
+            sentinel.issue_id, sentinel.config, sentinel.options)
+
+    def test_get_issues_keeps_order(self):
+        self.tracker.get_issue.side_effect = lambda issue, c, o: issue * 10
+
+        results = self.async_tracker.get_issues(range(20), sentinel.config,
+                                                sentinel.options)
+
+        eq_(wait_all(results), [i * 10 for i in range(20)])
+
+    def test_get_issues_runs_concurrently(self):
+        barrier = threading.Event()
+        running = []
+
+        def get_issue(issue, _config, _options):
+            running.append(issue)
+            if len(running) == 3:
+                barrier.set()
+            # Only returns if all three calls are running at the same time
+            eq_(barrier.wait(5), True)
+            return issue
+        self.tracker.get_issue.side_effect = get_issue
+
+        results = self.async_tracker.get_issues([1, 2, 3], sentinel.config,
+                                                sentinel.options)
+
+        eq_(wait_all(results), [1, 2, 3])
+
+    def test_get_issue_list(self):
+        self.tracker.get_issue_list.return_value = sentinel.issue_list
+
+        result = self.async_tracker.get_issue_list(sentinel.config,
+                                                   sentinel.options)
+
+        eq_(result.get(), sentinel.issue_list)
+
+    def test_take_issue_invalidates_cache(self):
+        result = self.async_tracker.take_issue(sentinel.issue_id,
+                                               sentinel.config, sentinel.options)
+        result.get()
+
+        self.tracker._take_issue.assert_called_once_with(
+            sentinel.issue_id, sentinel.config, sentinel.options)
+
+    def test_errors_are_raised_on_get(self):
+        self.tracker.get_issue.side_effect = ValueError('the_error')
+
+        result = self.async_tracker.get_issue(sentinel.issue_id,
+                                              sentinel.config, sentinel.options)
+
+        self.assertRaisesRegexp(ValueError, 'the_error', result.get)
+
+    def test_asks_for_password_before_starting_workers(self):
+        self.async_tracker.get_issue(sentinel.issue_id, sentinel.config,
+                                     sentinel.options).get()
+        self.tracker._ask_for_password.assert_called_once_with()
+
+    def test_context_manager_closes_pool(self):
+        with AsyncIssueTracker(self.tracker) as async_tracker:
+            async_tracker.get_issue(sentinel.issue_id, sentinel.config,
+                                    sentinel.options)
+        eq_(async_tracker._pool, None)
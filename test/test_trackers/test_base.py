@@ -5,11 +5,21 @@
 from __future__ import absolute_import, unicode_literals
 
 import argparse
+import json
 import logging
+import os
+import shutil
+import sys
+import tempfile
 
 from nose.tools import eq_
+from six import StringIO
 import requests
 
+from issue2branch.cache import CacheMiss, IssueCache
+from issue2branch.config import Config
+from issue2branch.index import IssueIndex
+from issue2branch.issue import Issue, IssueTree
 from issue2branch.trackers.base import IssueTracker, RepoIssueTracker
 
 from ..mock_objects import MockRepoData, MockRemoteData
@@ -24,11 +34,24 @@ logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 TRACKER_OPTIONS_DEFAULTS = {
     'issue': None,
+    'more_issues': [],
+    'from_file': None,
     'list': False,
     'limit': None,
     'noop': False,
     'take': None,
-    'show': None
+    'show': None,
+    'search': None,
+    'sync': False,
+    'daemon': False,
+    'format': 'text',
+    'profile': None,
+    'profile_output': None,
+    'timings': False,
+    'timings_file': None,
+    'trace': None,
+    'offline': False,
+    'refresh': False,
 }
 MockTrackerOptions = namedtuple_with_defaults('MockTrackerOptions',
                                               list(TRACKER_OPTIONS_DEFAULTS),
@@ -111,6 +134,11 @@ class IssueTrackerRequest(TestCase):
         eq_(response, sentinel.response_two)
 
 
+def test_session_is_reused():
+    tracker = IssueTracker()
+    eq_(tracker.session, tracker.session)
+
+
 class IssueTrackerParsing(TestCase):
     ''' Tests for issue / issue list fetching/parsing. '''
     def setUp(self):
@@ -125,7 +153,8 @@ class IssueTrackerParsing(TestCase):
             'issue2branch.trackers.base.get_response_content', autospec=True)
         self.mock_get_content = self.patcher_get_content.start()
 
-        self.mock_request.return_value = sentinel.response
+        self.response = create_autospec(requests.Response, links={})
+        self.mock_request.return_value = self.response
         self.mock_get_content.return_value = sentinel.content
 
     def tearDown(self):
@@ -140,9 +169,9 @@ class IssueTrackerParsing(TestCase):
 
         self.mock_get_issue_list_url.assert_called_once_with(
             sentinel.config, sentinel.options)
-        self.mock_request.assert_called_once_with(requests.get,
+        self.mock_request.assert_called_once_with(self.tracker.session.get,
                                                   sentinel.list_url)
-        self.mock_get_content.assert_called_once_with(sentinel.response)
+        self.mock_get_content.assert_called_once_with(self.response)
         self.mock_parse_issue_list.assert_called_once_with(sentinel.content,
                                                            sentinel.config,
                                                            sentinel.options)
@@ -159,15 +188,123 @@ class IssueTrackerParsing(TestCase):
         self.mock_get_issue_url.assert_called_once_with(sentinel.issue_id,
                                                         sentinel.config,
                                                         sentinel.options)
-        self.mock_request.assert_called_once_with(requests.get,
+        self.mock_request.assert_called_once_with(self.tracker.session.get,
                                                   sentinel.issue_url)
-        self.mock_get_content.assert_called_once_with(sentinel.response)
+        self.mock_get_content.assert_called_once_with(self.response)
         self.mock_parse_issue.assert_called_once_with(sentinel.content,
                                                       sentinel.config,
                                                       sentinel.options)
         eq_(issue, sentinel.parsed_issue)
 
 
+class IssueTrackerCacheTests(TestCase):
+    ''' Tests for the cache lookups in `IssueTracker.get_issue`. '''
+    def setUp(self):
+        self.cache = create_autospec(IssueCache, instance=True)
+        self.tracker = IssueTracker(cache=self.cache)
+        self.mock_get_issue_url = self.patch_object(self.tracker, 'get_issue_url')
+        self.mock_parse_issue = self.patch_object(self.tracker, 'parse_issue')
+        self.mock_request = self.patch_object(self.tracker, '_request')
+        self.mock_get_content = self.patch(
+            'issue2branch.trackers.base.get_response_content', autospec=True)
+
+        self.entry = {
+            'content': sentinel.cached_content,
+            'validators': {'etag': '"the_etag"'},
+        }
+        self.response = create_autospec(requests.Response, status_code=200,
+                                        headers={'etag': '"new_etag"'},
+                                        links={})
+        self.mock_get_issue_url.return_value = sentinel.issue_url
+        self.mock_parse_issue.side_effect = lambda content, c, o: content
+        self.mock_request.return_value = self.response
+        self.mock_get_content.return_value = sentinel.fetched_content
+        self.cache.revalidate.side_effect = lambda entry: entry
+
+    def _get_issue(self, **options):
+        return self.tracker.get_issue('123', sentinel.config,
+                                      MockTrackerOptions(**options))
+
+    def test_fresh_entry_skips_request(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = True
+
+        issue = self._get_issue()
+
+        self.cache.get_entry.assert_called_once_with('IssueTracker#issue:123')
+        eq_(self.mock_request.called, False, '_request was called')
+        eq_(issue, sentinel.cached_content)
+
+    def test_cache_miss_stores_content(self):
+        self.cache.get_entry.return_value = None
+
+        issue = self._get_issue()
+
+        self.mock_request.assert_called_once_with(self.tracker.session.get, sentinel.issue_url)
+        self.cache.set.assert_called_once_with(
+            'IssueTracker#issue:123', sentinel.fetched_content,
+            validators={'etag': '"new_etag"'}, links={})
+        eq_(issue, sentinel.fetched_content)
+
+    def test_stale_entry_is_revalidated(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = False
+
+        self._get_issue()
+
+        self.mock_request.assert_called_once_with(
+            self.tracker.session.get, sentinel.issue_url,
+            headers={'If-None-Match': '"the_etag"'})
+
+    def test_not_modified_reuses_entry(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = False
+        self.response.status_code = 304
+
+        issue = self._get_issue()
+
+        self.cache.revalidate.assert_called_once_with(self.entry)
+        eq_(self.mock_get_content.called, False, 'response was decoded')
+        eq_(self.cache.set.called, False, 'cache was overwritten')
+        eq_(issue, sentinel.cached_content)
+
+    def test_modified_replaces_entry(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = False
+
+        issue = self._get_issue()
+
+        self.cache.set.assert_called_once_with(
+            'IssueTracker#issue:123', sentinel.fetched_content,
+            validators={'etag': '"new_etag"'}, links={})
+        eq_(issue, sentinel.fetched_content)
+
+    def test_refresh_revalidates_fresh_entry(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = True
+
+        issue = self._get_issue(refresh=True)
+
+        self.mock_request.assert_called_once_with(
+            self.tracker.session.get, sentinel.issue_url,
+            headers={'If-None-Match': '"the_etag"'})
+        eq_(issue, sentinel.fetched_content)
+
+    def test_offline_ignores_ttl(self):
+        self.cache.get_entry.return_value = self.entry
+        self.cache.is_fresh.return_value = False
+
+        issue = self._get_issue(offline=True)
+
+        eq_(self.mock_request.called, False, '_request was called')
+        eq_(issue, sentinel.cached_content)
+
+    def test_offline_miss_fails(self):
+        self.cache.get_entry.return_value = None
+
+        self.assertRaises(CacheMiss, self._get_issue, offline=True)
+        eq_(self.mock_request.called, False, '_request was called')
+
 
 class IssueTrackerCreateTests(TestCase):
     _CONFIG = '''
@@ -207,6 +344,40 @@ password = the_password
                             password=sentinel.other_password)
         eq_(self.init_mock.call_args[1]['password'], sentinel.other_password)
 
+    @patch('issue2branch.trackers.base.create_session', autospec=True)
+    def test_session_is_created_from_config(self, mock_create_session):
+        mock_create_session.return_value = sentinel.session
+        config = config_from_string('''
+[http]
+pool_size = 3
+retries = 5
+backoff = 1.5
+''')
+        IssueTracker.create(config)
+
+        mock_create_session.assert_called_once_with(pool_size=3, retries=5,
+                                                    backoff=1.5)
+        eq_(self.init_mock.call_args[1]['session'], sentinel.session)
+
+    def test_session_kwarg_overrides_config(self):
+        IssueTracker.create(self.config, session=sentinel.session)
+        eq_(self.init_mock.call_args[1]['session'], sentinel.session)
+
+    @patch('issue2branch.trackers.base.configure_rate_limits', autospec=True)
+    def test_rate_limit_wait_is_set_from_config(self, mock_configure):
+        config = config_from_string('[http]\nrate_limit_wait = 90\n')
+        IssueTracker.create(config)
+        mock_configure.assert_called_once_with(90.0)
+
+    def test_workers_from_config(self):
+        IssueTracker.create(config_from_string('[http]\nworkers = 1\n'))
+        eq_(self.init_mock.call_args[1]['workers'], 1)
+
+    def test_non_positive_workers_break(self):
+        self.assertRaisesRegexp(ValueError, 'Workers must be positive: 0',
+                                IssueTracker.create,
+                                config_from_string('[http]\nworkers = 0\n'))
+
 
 class IssueTrackerParseArgs(TestCase):
     def setUp(self):
@@ -249,6 +420,38 @@ class IssueTrackerParseArgs(TestCase):
         options = self.parser.parse_args([])
         eq_(options.limit, None)
 
+    def test_format_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.format, 'text')
+
+    def test_format(self):
+        options = self.parser.parse_args(['--format', 'jsonl'])
+        eq_(options.format, 'jsonl')
+
+    def test_daemon_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.daemon, False)
+
+    def test_daemon(self):
+        options = self.parser.parse_args(['--daemon'])
+        eq_(options.daemon, True)
+
+    def test_sync_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.sync, False)
+
+    def test_sync(self):
+        options = self.parser.parse_args(['--sync'])
+        eq_(options.sync, True)
+
+    def test_search_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.search, None)
+
+    def test_search(self):
+        options = self.parser.parse_args(['--search', 'login timeout'])
+        eq_(options.search, 'login timeout')
+
     def test_limit(self):
         options = self.parser.parse_args(['--limit', '10'])
         eq_(options.limit, 10)
@@ -277,6 +480,262 @@ class IssueTrackerParseArgs(TestCase):
         options = self.parser.parse_args(['-t'])
         eq_(options.take, True)
 
+    def test_more_issues_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.more_issues, [])
+
+    def test_more_issues(self):
+        options = self.parser.parse_args(['1', '2', '5-7'])
+        eq_(options.issue, '1')
+        eq_(options.more_issues, ['2', '5-7'])
+
+    def test_from_file_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.from_file, None)
+
+    def test_offline_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.offline, False)
+
+    def test_offline(self):
+        options = self.parser.parse_args(['--offline'])
+        eq_(options.offline, True)
+
+    def test_refresh_default(self):
+        options = self.parser.parse_args([])
+        eq_(options.refresh, False)
+
+    def test_refresh(self):
+        options = self.parser.parse_args(['--refresh'])
+        eq_(options.refresh, True)
+
+
+class GetIssueIdsTests(TestCase):
+    ''' Tests for `IssueTracker.get_issue_ids`. '''
+    @staticmethod
+    def _test(expected, **options):
+        eq_(IssueTracker.get_issue_ids(MockTrackerOptions(**options)), expected)
+
+    def test_no_issues(self):
+        self._test([])
+
+    def test_single_issue(self):
+        self._test(['12'], issue='12')
+
+    def test_many_issues(self):
+        self._test(['12', '15', '3'], issue='12', more_issues=['15', '3'])
+
+    def test_ranges_are_expanded(self):
+        self._test(['12', '19', '20', '21'], issue='12', more_issues=['19-21'])
+
+    def test_non_numeric_ranges_are_kept(self):
+        self._test(['PROJ-12'], issue='PROJ-12')
+
+    def test_reversed_range_fails(self):
+        self.assertRaisesRegexp(ValueError, "Invalid issue range: '21-19'",
+                                IssueTracker.get_issue_ids,
+                                MockTrackerOptions(issue='21-19'))
+
+    def test_duplicates_are_dropped(self):
+        self._test(['1', '2', '3'], issue='1', more_issues=['1-3', '2'])
+
+    def test_from_file(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        from_file = os.path.join(path, 'issues')
+        with open(from_file, 'w') as fobj:
+            fobj.write('7\n\n# A comment\n8-9  # A range\n')
+        self._test(['1', '7', '8', '9'], issue='1', from_file=from_file)
+
+    def test_from_stdin(self):
+        self.patch('sys.stdin', new_callable=lambda: StringIO('7\n8\n'))
+        self._test(['7', '8'], from_file='-')
+
+    def test_missing_file_fails(self):
+        self.assertRaisesRegexp(ValueError, "Could not read issues from",
+                                IssueTracker.get_issue_ids,
+                                MockTrackerOptions(from_file='/missing/file'))
+
+
+class BranchIssuesTests(TestCase):
+    ''' Tests for `IssueTracker._branch_issues`. '''
+    def setUp(self):
+        self.tracker = IssueTracker(workers=2)
+        self.mock_stdout = self.patch('sys.stdout', new_callable=StringIO)
+        self.repository = Mock()
+        self.taken = []
+
+    def _get_issue(self, issue_id, _config, _options):
+        if issue_id == '2':
+            raise ValueError('Not found')
+        return Issue(issue_id, 'title {}'.format(issue_id))
+
+    def _branch(self, issue_ids, take=False):
+        self.patch_object(self.tracker, 'get_issue',
+                          side_effect=self._get_issue)
+        self.patch_object(self.tracker, '_take_issue',
+                          side_effect=lambda i, *_: self.taken.append(i))
+        options = MockTrackerOptions(take=take)
+        self.tracker._branch_issues(
+            issue_ids, Config.from_sections({}), options, self.repository,
+            lambda _message, callback, *args: callback(*args))
+        return self.mock_stdout.getvalue()
+
+    def test_failing_issue_is_skipped(self):
+        output = self._branch(['1', '2', '3'], take=True)
+
+        self.repository.create_branches.assert_called_once_with(
+            ['issue-1-title-1', 'issue-3-title-3'])
+        eq_(sorted(self.taken), ['1', '3'])
+        self.assertIn("Could not get issue '2': Not found", output)
+        self.assertIn("Skipped 1 issues: 2", output)
+
+    def test_all_failing_issues_fail(self):
+        self.assertRaisesRegexp(ValueError, "Could not get any of the issues",
+                                self._branch, ['2'])
+        eq_(self.repository.create_branches.called, False)
+
+
+class WalkIssuesTests(TestCase):
+    ''' Tests for `IssueTracker._walk_issues`. '''
+    @staticmethod
+    def _walk(issues):
+        return [(depth, issue.issue_id)
+                for depth, issue in IssueTracker._walk_issues(issues)]
+
+    def test_depth_first(self):
+        tree = IssueTree()
+        tree.extend([Issue(1, 'one'), Issue(2, 'two'), Issue(3, 'three', parent=1),
+                     Issue(5, 'five', parent=3), Issue(4, 'four', parent=1)])
+        roots = [issue for _, issue in sorted(tree.roots.items())]
+
+        eq_(self._walk(roots), [(0, 1), (1, 3), (2, 5), (1, 4), (0, 2)])
+
+    def test_keeps_roots_order(self):
+        eq_(self._walk([Issue(3, 'three'), Issue(1, 'one')]), [(0, 3), (0, 1)])
+
+    def test_deep_chain(self):
+        depth = sys.getrecursionlimit() * 2
+        tree = IssueTree()
+        tree.extend(Issue(i, 'issue', parent=i - 1 if i else None)
+                    for i in range(depth))
+
+        walked = self._walk(tree.roots.values())
+
+        eq_(len(walked), depth)
+        eq_(walked[-1], (depth - 1, depth - 1))
+
+
+class ListTests(TestCase):
+    ''' Tests for `IssueTracker._list`. '''
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.config = Config.from_sections({
+            'index': {'path': os.path.join(self.path, 'index.sqlite')},
+        })
+        self.tracker = IssueTracker()
+        self.mock_stdout = self.patch('sys.stdout', new_callable=StringIO)
+        self.mock_stderr = self.patch('sys.stderr', new_callable=StringIO)
+
+    def _list(self, *pages, **kwargs):
+        def iter_pages(_config, _options):
+            for page in pages:
+                yield page
+                self.printed.append(self.mock_stdout.getvalue())
+        self.printed = []
+        self.patch_object(self.tracker, 'iter_issue_pages',
+                          side_effect=iter_pages)
+        options = argparse.Namespace(format=kwargs.pop('format', 'text'))
+        self.tracker._list(self.config, options)
+        return self.mock_stdout.getvalue()
+
+    def test_pages_are_printed_as_they_arrive(self):
+        self._list([Issue(2, 'two')], [Issue(1, 'one')])
+
+        self.assertIn('two', self.printed[0])
+        self.assertNotIn('one', self.printed[0])
+
+    def test_streamed_count(self):
+        output = self._list([Issue(2, 'two')], [Issue(1, 'one')])
+
+        self.assertIn('Got 2 issues', output)
+
+    def test_unwritable_index_does_not_break_listing(self):
+        blocker = os.path.join(self.path, 'blocker')
+        open(blocker, 'w').close()
+        self.config = Config.from_sections({
+            'index': {'path': os.path.join(blocker, 'index.sqlite')},
+        })
+
+        output = self._list([Issue(2, 'two')], [Issue(1, 'one')])
+
+        self.assertIn('Got 2 issues', output)
+        self.assertIn('one', output)
+
+    def test_subtasks_are_printed_as_a_tree(self):
+        self.tracker.SUBTASKS = True
+
+        output = self._list([Issue(2, 'child', parent=1)], [Issue(1, 'parent')])
+
+        eq_(self.printed[0], '')
+        self.assertLess(output.index('parent'), output.index('child'))
+        self.assertIn('   * 2 -', output)
+
+    def test_jsonl_format(self):
+        output = self._list([Issue(2, 'two')], [Issue(1, 'one')],
+                            format='jsonl')
+
+        eq_([json.loads(line)['issue_id'] for line in output.splitlines()],
+            [2, 1])
+        self.assertIn('Got 2 issues', self.mock_stderr.getvalue())
+
+
+class SyncTests(TestCase):
+    ''' Tests for `IssueTracker._sync`. '''
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.config = Config.from_sections({
+            'index': {'path': os.path.join(path, 'index.sqlite')},
+        })
+        self.tracker = IssueTracker()
+        self.mock_iter_updated = self.patch_object(self.tracker,
+                                                   'iter_updated_issue_pages')
+        self.mock_iter_updated.return_value = [[Issue(1, 'one')],
+                                               [Issue(2, 'two')]]
+
+    def _sync(self):
+        self.tracker._sync(self.config, sentinel.options)
+        return IssueIndex.from_config(self.config)
+
+    def test_first_sync_fetches_everything(self):
+        self._sync()
+        self.mock_iter_updated.assert_called_once_with(self.config,
+                                                       sentinel.options, None)
+
+    def test_synced_issues_are_indexed(self):
+        with self._sync() as index:
+            eq_(len(index), 2)
+            eq_([i.issue_id for i in index.search(self.tracker.scope, 'two')],
+                [2])
+
+    def test_sync_uses_last_sync_timestamp(self):
+        with self._sync() as index:
+            last_sync = index.get_last_sync(self.tracker.scope)
+        self.mock_iter_updated.reset_mock()
+
+        self._sync()
+
+        self.mock_iter_updated.assert_called_once_with(self.config,
+                                                       sentinel.options,
+                                                       last_sync)
+
+    def test_failed_sync_keeps_timestamp(self):
+        self.mock_iter_updated.side_effect = NotImplementedError()
+        with self._sync() as index:
+            eq_(index.get_last_sync(self.tracker.scope), None)
+
 
 def test_issue_tracker_parse_args():
     parser_mock = create_autospec(argparse.ArgumentParser)
@@ -352,6 +811,20 @@ limit = -1
                                       self.options_no_limit)
 
 
+class BranchMaxLengthTests(TestCase):
+    def test_default(self):
+        eq_(IssueTracker.get_branch_max_length(config_from_string('')), None)
+
+    def test_config(self):
+        config = config_from_string('[branch]\nmax_length = 30\n')
+        eq_(IssueTracker.get_branch_max_length(config), 30)
+
+    def test_non_positive_breaks(self):
+        config = config_from_string('[branch]\nmax_length = 0\n')
+        self.assertRaisesRegexp(ValueError, 'Branch max length must be positive',
+                                IssueTracker.get_branch_max_length, config)
+
+
 class ExtractOrNoneTests(TestCase):
     def setUp(self):
         self.data = {
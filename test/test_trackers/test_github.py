@@ -8,10 +8,13 @@ import logging
 
 from mock import patch, sentinel
 from nose.tools import eq_
-import requests
+from six.moves.urllib.parse import (  # pylint: disable=import-error
+    parse_qs, urlencode, urlparse
+)
 
 from ..utils import TestCase
 
+from issue2branch.trackers.base import Page
 from issue2branch.trackers.github import Github
 from issue2branch.config import Config
 
@@ -25,12 +28,29 @@ class GithubTests(TestCase):
 
     def test_get_issue_list_url(self):
         with patch.object(self.tracker, 'get_list_limit') as mock_get_limit:
-            mock_get_limit.return_value = '12345'
+            mock_get_limit.return_value = 45
 
             eq_(self.tracker.get_issue_list_url(sentinel.config, sentinel.options),
-                "https://api.github.com/repos/repo_user/repo_name/issues?per_page=12345")
+                "https://api.github.com/repos/repo_user/repo_name/issues?per_page=45")
             mock_get_limit.assert_called_once_with(sentinel.config, sentinel.options)
 
+    def test_get_issue_list_url_caps_per_page(self):
+        with patch.object(self.tracker, 'get_list_limit') as mock_get_limit:
+            mock_get_limit.return_value = 12345
+
+            eq_(self.tracker.get_issue_list_url(sentinel.config, sentinel.options),
+                "https://api.github.com/repos/repo_user/repo_name/issues?per_page=100")
+
+    def test_get_issue_list_url_page(self):
+        with patch.object(self.tracker, 'get_list_limit') as mock_get_limit:
+            mock_get_limit.return_value = 12345
+
+            url = self.tracker.get_issue_list_url(sentinel.config, sentinel.options,
+                                                  page=3)
+            parsed_qs = parse_qs(urlparse(url).query)
+            eq_(parsed_qs['per_page'], ['100'])
+            eq_(parsed_qs['page'], ['3'])
+
 
     def test_parse_issue_list(self):
         objects = {
@@ -55,6 +75,116 @@ class GithubTests(TestCase):
             'https://api.github.com/repos/repo_user/repo_name/issues/the_issue')
 
 
+class IterIssuePagesTests(TestCase):
+    ''' Tests for `Github.iter_issue_pages`. '''
+    _BASE_URL = 'https://api.github.com/repos/repo_user/repo_name/issues'
+
+    def setUp(self):
+        self.tracker = Github(repo_user='repo_user', repo_name='repo_name')
+        self.mock_get_limit = self.patch_object(self.tracker, 'get_list_limit')
+        self.mock_fetch = self.patch_object(self.tracker, '_fetch')
+        self.mock_fetch.side_effect = self._fetch
+        self.pages = {}
+
+    def _fetch(self, _key, url, _options):
+        return self.pages[url]
+
+    def _set_pages(self, count, per_page, total, last_link=True):
+        for number in range(1, count + 1):
+            url = self._page_url(number, per_page)
+            first = (number - 1) * per_page
+            content = [{'number': i, 'title': 'title', 'body': None}
+                       for i in range(first, min(first + per_page, total))]
+            links = {}
+            if number < count:
+                links['next'] = self._page_url(number + 1, per_page)
+                if last_link:
+                    links['last'] = self._page_url(count, per_page)
+            self.pages[url] = Page(content, links)
+
+    def _page_url(self, number, per_page):
+        if number == 1:
+            return '{}?per_page={}'.format(self._BASE_URL, per_page)
+        return '{}?{}'.format(self._BASE_URL, urlencode([('per_page', per_page),
+                                                         ('page', number)]))
+
+    def _issue_ids(self):
+        return [[i.issue_id for i in page] for page in
+                self.tracker.iter_issue_pages(sentinel.config, sentinel.options)]
+
+    def test_single_page(self):
+        self.mock_get_limit.return_value = 40
+        self._set_pages(1, 40, 10)
+        eq_(self._issue_ids(), [list(range(10))])
+
+    def test_fetches_linked_pages_up_to_limit(self):
+        self.mock_get_limit.return_value = 250
+        self._set_pages(5, 100, 500)
+
+        pages = self._issue_ids()
+
+        eq_(pages, [list(range(0, 100)), list(range(100, 200)),
+                    list(range(200, 250))])
+        eq_(self.mock_fetch.call_count, 3)
+
+    def test_stops_at_last_page(self):
+        self.mock_get_limit.return_value = 500
+        self._set_pages(3, 100, 230)
+        eq_(sum(self._issue_ids(), []), list(range(230)))
+
+    def test_follows_next_links(self):
+        self.mock_get_limit.return_value = 500
+        self._set_pages(3, 100, 230, last_link=False)
+        eq_(sum(self._issue_ids(), []), list(range(230)))
+
+    def test_get_issue_list_merges_pages(self):
+        self.mock_get_limit.return_value = 300
+        self._set_pages(3, 100, 300)
+        issues = self.tracker.get_issue_list(sentinel.config, sentinel.options)
+        eq_([i.issue_id for i in issues], list(range(300)))
+
+
+class UpdatedIssuesTests(TestCase):
+    ''' Tests for `Github.iter_updated_issue_pages`. '''
+    def setUp(self):
+        self.tracker = Github(repo_user='repo_user', repo_name='repo_name')
+
+    def _query(self, since, page=1):
+        url = self.tracker.get_updated_issue_list_url(since, page=page)
+        return parse_qs(urlparse(url).query)
+
+    def test_url(self):
+        query = self._query('2015-01-02T03:04:05Z')
+        eq_(query['since'], ['2015-01-02T03:04:05Z'])
+        eq_(query['state'], ['all'])
+        eq_(query['per_page'], ['100'])
+        self.assertNotIn('page', query)
+
+    def test_url_without_since(self):
+        self.assertNotIn('since', self._query(None))
+
+    def test_url_page(self):
+        eq_(self._query(None, page=4)['page'], ['4'])
+
+    def test_fetches_all_pages_uncached(self):
+        urls = [self.tracker.get_updated_issue_list_url('since', page=n)
+                for n in [1, 2, 3]]
+        pages = {
+            url: Page([{'number': n, 'title': 'title', 'body': None}],
+                      {'last': urls[-1]})
+            for n, url in enumerate(urls)
+        }
+        mock_fetch = self.patch_object(self.tracker, '_fetch')
+        mock_fetch.side_effect = lambda key, url, options: pages[url]
+
+        issues = sum(self.tracker.iter_updated_issue_pages(
+            sentinel.config, sentinel.options, 'since'), [])
+
+        eq_([i.issue_id for i in issues], [0, 1, 2])
+        for call in mock_fetch.call_args_list:
+            eq_(call[0][0], None)
+
+
 class ParseIssueTests(TestCase):
     def setUp(self):
         self.tracker = Github(repo_user='repo_user', repo_name='repo_name')
@@ -133,7 +263,7 @@ class TakeIssue(TestCase):
     def test_uses_http_patch(self):
         self.tracker.take_issue('the_issue', sentinel.config, sentinel.options)
         eq_(self.mock_request.called, True, '_request was not called')
-        eq_(self.mock_request.call_args[0][0], requests.patch)
+        eq_(self.mock_request.call_args[0][0], self.tracker.session.patch)
 
     def test_uses_issue_url(self):
         self.tracker.take_issue('the_issue', sentinel.config, sentinel.options)
@@ -7,15 +7,18 @@ from __future__ import absolute_import, unicode_literals
 import argparse
 import json
 import logging
+import os
+import shutil
+import tempfile
 
 from mock import patch, sentinel
 from nose.tools import eq_
 from six.moves.urllib.parse import parse_qs, urlparse  # pylint: disable=import-error
-import requests
 
 from issue2branch.trackers.base import IssueTracker
 from issue2branch.trackers.redmine import Redmine
-from issue2branch.config import ConfigMissing
+from issue2branch.config import Config, ConfigMissing
+from issue2branch.index import IssueIndex
 
 from ..utils import (
     config_from_string, TestCase, namedtuple_with_defaults, parser_exit_replace)
@@ -81,12 +84,27 @@ class GetIssueListUrlTests(TestCase):
         self.assertNotIn('status_id', parsed_qs)
 
     def test_limit(self):
+        self.mock_get_limit.return_value = 45
         url = self.tracker.get_issue_list_url(sentinel.config, self.no_options)
 
         self.mock_get_limit.assert_called_once_with(sentinel.config,
                                                     self.no_options)
         parsed_qs = parse_qs(urlparse(url).query)
-        eq_(parsed_qs['limit'], ['12345'])
+        eq_(parsed_qs['limit'], ['45'])
+        self.assertNotIn('offset', parsed_qs)
+
+    def test_limit_is_capped(self):
+        url = self.tracker.get_issue_list_url(sentinel.config, self.no_options)
+
+        parsed_qs = parse_qs(urlparse(url).query)
+        eq_(parsed_qs['limit'], ['100'])
+
+    def test_offset(self):
+        url = self.tracker.get_issue_list_url(sentinel.config, self.no_options,
+                                              offset=300)
+
+        parsed_qs = parse_qs(urlparse(url).query)
+        eq_(parsed_qs['offset'], ['300'])
 
     def test_mine(self):
         options = MockRedmineOptions(mine=True)
@@ -139,6 +157,136 @@ def test_redmine_parse_issue_list():
         eq_(parsed, [issues[x] for x in json_list])
 
 
+class IssueListPagingTests(TestCase):
+    ''' Tests for offset paging in `Redmine.get_issue_list`. '''
+    def setUp(self):
+        self.tracker = Redmine('http://the_base_url')
+        self.mock_get_limit = self.patch_object(self.tracker, 'get_list_limit')
+        self.mock_get_content = self.patch_object(self.tracker, '_get_content')
+        self.mock_get_content.side_effect = self._get_content
+        self.total_count = 0
+        self.options = MockRedmineOptions()
+        self.config = config_from_string('')
+
+    def _get_content(self, _key, url, _options):
+        query = parse_qs(urlparse(url).query)
+        limit = int(query['limit'][0])
+        offset = int(query.get('offset', ['0'])[0])
+        ids = range(offset, min(offset + limit, self.total_count))
+        return {
+            'issues': [{'id': i, 'subject': 'subject'} for i in ids],
+            'total_count': self.total_count,
+            'offset': offset,
+            'limit': limit,
+        }
+
+    def _issue_ids(self):
+        issues = self.tracker.get_issue_list(self.config, self.options)
+        return [issue.issue_id for issue in issues]
+
+    def _requested_offsets(self):
+        return sorted(int(parse_qs(urlparse(c[0][1]).query).get('offset', ['0'])[0])
+                      for c in self.mock_get_content.call_args_list)
+
+    def test_single_page(self):
+        self.mock_get_limit.return_value = 40
+        self.total_count = 25
+        eq_(self._issue_ids(), list(range(25)))
+        eq_(self._requested_offsets(), [0])
+
+    def test_fetches_all_pages_in_order(self):
+        self.mock_get_limit.return_value = 1500
+        self.total_count = 1234
+        eq_(self._issue_ids(), list(range(1234)))
+        eq_(self._requested_offsets(), list(range(0, 1300, 100)))
+
+    def test_stops_at_limit(self):
+        self.mock_get_limit.return_value = 250
+        self.total_count = 1234
+        eq_(self._issue_ids(), list(range(250)))
+        eq_(self._requested_offsets(), [0, 100, 200])
+
+    def test_iter_issue_pages(self):
+        self.mock_get_limit.return_value = 250
+        self.total_count = 1234
+        pages = list(self.tracker.iter_issue_pages(self.config, self.options))
+        eq_([len(page) for page in pages], [100, 100, 50])
+
+
+class UpdatedIssuesTests(TestCase):
+    ''' Tests for `Redmine.iter_updated_issue_pages`. '''
+    def setUp(self):
+        self.tracker = Redmine('http://the_base_url')
+        self.config = config_from_string('')
+        self.options = MockRedmineOptions()
+
+    def _query(self, since, offset=0):
+        url = self.tracker.get_updated_issue_list_url(self.config, self.options,
+                                                      since, offset=offset)
+        return parse_qs(urlparse(url).query)
+
+    def test_url(self):
+        query = self._query('2015-01-02T03:04:05Z')
+        eq_(query['updated_on'], ['>=2015-01-02T03:04:05Z'])
+        eq_(query['status_id'], ['*'])
+        eq_(query['limit'], ['100'])
+        self.assertNotIn('offset', query)
+
+    def test_url_without_since(self):
+        self.assertNotIn('updated_on', self._query(None))
+
+    def test_url_offset(self):
+        eq_(self._query(None, offset=200)['offset'], ['200'])
+
+    def test_fetches_all_pages_uncached(self):
+        def get_content(_key, url, _options):
+            offset = int(parse_qs(urlparse(url).query).get('offset', ['0'])[0])
+            ids = range(offset, min(offset + 100, 250))
+            return {'issues': [{'id': i, 'subject': 's'} for i in ids],
+                    'total_count': 250}
+        mock_get_content = self.patch_object(self.tracker, '_get_content')
+        mock_get_content.side_effect = get_content
+
+        issues = sum(self.tracker.iter_updated_issue_pages(
+            self.config, self.options, 'since'), [])
+
+        eq_([i.issue_id for i in issues], list(range(250)))
+        for call in mock_get_content.call_args_list:
+            eq_(call[0][0], None)
+
+
+class SyncScopeTests(TestCase):
+    ''' Each project keeps its own last `--sync` timestamp. '''
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.config = Config.from_sections({
+            'index': {'path': os.path.join(path, 'index.sqlite')},
+        })
+        self.tracker = Redmine('http://the_base_url')
+        self.mock_iter_updated = self.patch_object(
+            self.tracker, 'iter_updated_issue_pages', return_value=[])
+
+    def _sync(self, project):
+        self.mock_iter_updated.reset_mock()
+        self.tracker._sync(self.config, MockRedmineOptions(project=project))
+        return self.mock_iter_updated.call_args[0][2]
+
+    def test_projects_sync_separately(self):
+        eq_(self._sync('a'), None)
+        eq_(self._sync('b'), None)
+        with IssueIndex.from_config(self.config) as index:
+            last_sync = index.get_last_sync(
+                self.tracker.get_sync_scope(self.config,
+                                            MockRedmineOptions(project='a')))
+        self.assertNotEqual(last_sync, None)
+        eq_(self._sync('a'), last_sync)
+
+    def test_all_projects_use_the_tracker_scope(self):
+        eq_(self.tracker.get_sync_scope(self.config, MockRedmineOptions()),
+            self.tracker.scope)
+
+
 def test_redmine_get_issue_url():
     tracker = Redmine('http://the_base_url')
     url = tracker.get_issue_url(
@@ -262,7 +410,7 @@ inprogress_id = 2
         self.tracker.take_issue(sentinel.issue, self.config, sentinel.options)
 
         eq_(self.mock_request.called, True, '_request was not called')
-        eq_(self.mock_request.call_args[0][0], requests.put)
+        eq_(self.mock_request.call_args[0][0], self.tracker.session.put)
 
     def test_uses_issue_url(self):
         self.tracker.take_issue(sentinel.issue, self.config, sentinel.options)
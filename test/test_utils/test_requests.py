@@ -4,12 +4,16 @@ from __future__ import absolute_import, unicode_literals
 
 from unittest import TestCase
 import logging
+import threading
+import time
 import uuid
 import warnings
 import sys
 
 from nose.tools import eq_, raises
 from requests.packages.urllib3.exceptions import InsecurePlatformWarning
+from requests.structures import CaseInsensitiveDict
+from six.moves import BaseHTTPServer  # pylint: disable=import-error
 import requests
 import six
 
@@ -17,7 +21,9 @@ import six
 from ..utils.mock import create_autospec, patch, sentinel
 
 from issue2branch.utils.requests import (
-    request, get_response_content, NotOkResponse, _reset_platform_warning)
+    request, get_response_content, NotOkResponse, RateLimited, RateLimiter,
+    _reset_platform_warning, _reset_json_decoder,
+    get_validators, get_links, conditional_headers, create_session)
 
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -27,22 +33,24 @@ class TestRequest(TestCase):
     ''' Tests for `issue2branch.utils.requests.request`. '''
     def setUp(self):
         self.method = create_autospec(requests.get)
-        self.response = create_autospec(requests.Response, status_code=200)
+        self.response = create_autospec(requests.Response, status_code=200,
+                                        headers=CaseInsensitiveDict())
         self.method.return_value = self.response
+        self.url = 'https://api.example.com/issues'
 
     def test_no_user_proxy(self):
-        response = request(self.method, sentinel.url,
+        response = request(self.method, self.url,
                            kwarg=sentinel.kwvalue)
-        self.method.assert_called_once_with(sentinel.url,
+        self.method.assert_called_once_with(self.url,
                                             kwarg=sentinel.kwvalue)
         eq_(response, self.response)
 
 
     def test_user_proxy(self):
-        request(self.method, sentinel.url,
+        request(self.method, self.url,
                 sentinel.username, sentinel.password,
                 kwarg=sentinel.kwvalue)
-        self.method.assert_called_once_with(sentinel.url,
+        self.method.assert_called_once_with(self.url,
                                             auth=(sentinel.username,
                                                   sentinel.password),
                                             kwarg=sentinel.kwvalue)
@@ -50,17 +58,28 @@ class TestRequest(TestCase):
     @raises(NotOkResponse)
     def test_not_found_fails(self):
         self.response.status_code = 404
-        request(self.method, sentinel.url)
+        request(self.method, self.url)
 
     @raises(NotOkResponse)
     def test_server_error_fails(self):
         self.response.status_code = 500
-        request(self.method, sentinel.url)
+        request(self.method, self.url)
+
+    @raises(NotOkResponse)
+    def test_unconditional_not_modified_fails(self):
+        self.response.status_code = 304
+        request(self.method, self.url)
+
+    def test_conditional_not_modified_is_ok(self):
+        self.response.status_code = 304
+        response = request(self.method, self.url,
+                           headers={'If-None-Match': '"the_etag"'})
+        eq_(response, self.response)
 
     def test_exception_contains_response(self):
         self.response.status_code = 500
         try:
-            request(self.method, sentinel.url)
+            request(self.method, self.url)
         except NotOkResponse as err:
             eq_(err.response, self.response)
 
@@ -75,7 +94,7 @@ class TestRequest(TestCase):
         _reset_platform_warning()
         self.method.side_effect = self._warn_and_respond(InsecurePlatformWarning)
         with warnings.catch_warnings(record=True) as warns:
-            response = request(self.method, sentinel.url)
+            response = request(self.method, self.url)
             eq_(warns, [])
             eq_(response, self.response)
 
@@ -83,7 +102,7 @@ class TestRequest(TestCase):
         _reset_platform_warning()
         self.method.side_effect = self._warn_and_respond(Warning, 'warning_message')
         with warnings.catch_warnings(record=True) as warns:
-            response = request(self.method, sentinel.url)
+            response = request(self.method, self.url)
             eq_(len(warns), 1)
             self.assertIn('warning_message', str(warns[0]))
             eq_(response, self.response)
@@ -94,7 +113,7 @@ class TestRequest(TestCase):
         buff = six.StringIO()
         sys.stdout = buff
         try:
-            request(self.method, sentinel.url)
+            request(self.method, self.url)
         finally:
             sys.stdout = sys.__stdout__
         self.assertIn('Got an InsecurePlatformWarning. Upgrade python to 2.7.9 or better to remove.',
@@ -107,29 +126,40 @@ class TestGetResponseContent(TestCase):
         self.response = create_autospec(requests.Response)
 
     def test_parses_json(self):
-        self.response.json.return_value = sentinel.json
+        self.response.content = b'{"id": 1, "title": "the_title \\u00e1"}'
         self.response.headers = {
-            'content-type': 'application/json',
+            'content-type': 'application/json; charset=utf-8',
         }
 
         content = get_response_content(self.response)
 
-        self.response.json.assert_called_once_with()
-        eq_(content, sentinel.json)
+        eq_(content, {'id': 1, 'title': 'the_title \u00e1'})
 
-    @patch('issue2branch.utils.requests.BeautifulSoup')
-    def test_parses_html(self, mock_soup):
+    @patch('bs4.BeautifulSoup')
+    def test_parses_html_if_asked(self, mock_soup):
         self.response.content = sentinel.content
         self.response.headers = {
             'content-type': 'text/html',
         }
         mock_soup.return_value = sentinel.soup
 
-        content = get_response_content(self.response)
+        content = get_response_content(self.response, parse_html=True)
 
         mock_soup.assert_called_once_with(sentinel.content)
         eq_(content, sentinel.soup)
 
+    @patch('bs4.BeautifulSoup')
+    def test_does_not_parse_html_by_default(self, mock_soup):
+        self.response.content = sentinel.content
+        self.response.headers = {
+            'content-type': 'text/html',
+        }
+
+        content = get_response_content(self.response)
+
+        eq_(mock_soup.called, False)
+        eq_(content, sentinel.content)
+
     def test_parses_plain(self):
         self.response.content = sentinel.content
         self.response.headers = {
@@ -138,3 +168,218 @@ class TestGetResponseContent(TestCase):
 
         content = get_response_content(self.response)
         eq_(content, sentinel.content)
+
+
+class TestJsonDecoder(TestCase):
+    ''' Tests for the JSON decoder selection. '''
+    def setUp(self):
+        _reset_json_decoder()
+        self.addCleanup(_reset_json_decoder)
+        self.response = create_autospec(requests.Response)
+        self.response.content = b'[1, 2]'
+        self.response.headers = {'content-type': 'application/json'}
+
+    @patch('issue2branch.utils.requests.importlib.import_module')
+    def test_prefers_fast_decoders(self, mock_import):
+        mock_import.return_value.loads.return_value = sentinel.decoded
+
+        eq_(get_response_content(self.response), sentinel.decoded)
+
+        mock_import.assert_called_once_with('orjson')
+        mock_import.return_value.loads.assert_called_once_with(b'[1, 2]')
+
+    @patch('issue2branch.utils.requests.importlib.import_module')
+    def test_falls_back_to_json_module(self, mock_import):
+        mock_import.side_effect = ImportError()
+
+        eq_(get_response_content(self.response), [1, 2])
+
+    @patch('issue2branch.utils.requests.importlib.import_module')
+    def test_decoder_is_selected_once(self, mock_import):
+        mock_import.side_effect = ImportError()
+
+        get_response_content(self.response)
+        get_response_content(self.response)
+
+        eq_(mock_import.call_count, 2)  # orjson and ujson, only once
+
+
+class TestHeaderHelpers(TestCase):
+    ''' Tests for `get_validators`, `get_links` and `conditional_headers`. '''
+    def test_get_validators(self):
+        response = create_autospec(requests.Response)
+        response.headers = requests.structures.CaseInsensitiveDict({
+            'ETag': '"the_etag"',
+            'Last-Modified': 'the_date',
+            'Content-Type': 'application/json',
+        })
+        eq_(get_validators(response),
+            {'etag': '"the_etag"', 'last-modified': 'the_date'})
+
+    def test_get_validators_missing(self):
+        response = create_autospec(requests.Response)
+        response.headers = {'content-type': 'application/json'}
+        eq_(get_validators(response), {})
+
+    def test_get_links(self):
+        response = create_autospec(requests.Response)
+        response.links = {
+            'next': {'url': 'the_next_url', 'rel': 'next'},
+            'last': {'url': 'the_last_url', 'rel': 'last'},
+        }
+        eq_(get_links(response), {'next': 'the_next_url', 'last': 'the_last_url'})
+
+    def test_conditional_headers(self):
+        eq_(conditional_headers({'etag': '"the_etag"',
+                                 'last-modified': 'the_date'}),
+            {'If-None-Match': '"the_etag"', 'If-Modified-Since': 'the_date'})
+
+    def test_conditional_headers_empty(self):
+        eq_(conditional_headers(None), {})
+
+
+class TestCreateSession(TestCase):
+    ''' Tests for `issue2branch.utils.requests.create_session`. '''
+    def test_adapters_are_pooled(self):
+        session = create_session(pool_size=7, retries=2, backoff=0.5)
+        for prefix in ['http://', 'https://']:
+            adapter = session.get_adapter(prefix + 'example.com')
+            eq_(adapter._pool_connections, 7)  # pylint: disable=protected-access
+            eq_(adapter._pool_maxsize, 7)  # pylint: disable=protected-access
+            eq_(adapter.max_retries.total, 2)
+            eq_(adapter.max_retries.backoff_factor, 0.5)
+
+    def test_same_adapter_for_all_requests(self):
+        session = create_session()
+        eq_(session.get_adapter('https://example.com/a'),
+            session.get_adapter('https://example.com/b'))
+
+
+class TestRateLimits(TestCase):
+    ''' Tests for the rate limit handling of `request`. '''
+    def setUp(self):
+        self.offset = 0
+        self.limiter = RateLimiter(clock=lambda: time.time() + self.offset)
+        self.patcher = patch('issue2branch.utils.requests._RATE_LIMITER',
+                             self.limiter)
+        self.patcher.start()
+        self.stderr_patcher = patch('sys.stderr')
+        self.stderr_patcher.start()
+        self.method = create_autospec(requests.get)
+        self.url = 'https://api.example.com/issues'
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.stderr_patcher.stop()
+
+    @staticmethod
+    def _response(status_code=200, **headers):
+        return create_autospec(requests.Response, status_code=status_code,
+                               headers=CaseInsensitiveDict(headers))
+
+    def _respond(self, *responses):
+        self.method.side_effect = list(responses)
+
+    def test_retries_after_retry_after(self):
+        ok = self._response()
+        self._respond(self._response(429, **{'Retry-After': '0.01'}), ok)
+        eq_(request(self.method, self.url), ok)
+        eq_(self.method.call_count, 2)
+
+    def test_retries_secondary_rate_limits(self):
+        ok = self._response()
+        self._respond(self._response(403, **{'Retry-After': '0'}), ok)
+        eq_(request(self.method, self.url), ok)
+
+    @raises(NotOkResponse)
+    def test_forbidden_is_not_retried(self):
+        self._respond(self._response(403, **{'X-RateLimit-Remaining': '10'}))
+        try:
+            request(self.method, self.url)
+        finally:
+            eq_(self.method.call_count, 1)
+
+    def test_waits_for_reset(self):
+        reset = int(time.time()) + 10
+        self.offset = reset - 0.05 - time.time()  # Resets in 0.05s
+        ok = self._response()
+        self._respond(self._response(403, **{'X-RateLimit-Remaining': '0',
+                                             'X-RateLimit-Reset': str(reset)}),
+                      ok)
+        eq_(request(self.method, self.url), ok)
+        eq_(self.method.call_count, 2)
+
+    def test_gives_up_on_long_waits(self):
+        limited = self._response(403, **{
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset': str(int(time.time()) + 7200)})
+        self._respond(limited)
+        try:
+            request(self.method, self.url)
+        except RateLimited as err:
+            eq_(err.response, limited)
+        else:
+            self.fail("RateLimited was not raised")
+
+    def test_other_credentials_are_not_limited(self):
+        ok = self._response()
+        self._respond(self._response(403, **{
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset': str(int(time.time()) + 7200)}), ok)
+        self.assertRaises(RateLimited, request, self.method, self.url,
+                          'user', 'password')
+        eq_(request(self.method, self.url, 'other', 'password'), ok)
+
+    def test_concurrency_is_limited_to_remaining(self):
+        self.limiter.max_wait = 0
+        key = ('api.example.com', None)
+        self.limiter.acquire(key)
+        self.limiter.release(key, self._response(**{
+            'X-RateLimit-Remaining': '2',
+            'X-RateLimit-Reset': str(int(time.time()) + 3600)}))
+        self.limiter.acquire(key)
+        self.limiter.acquire(key)
+        self.assertRaises(RateLimited, self.limiter.acquire, key)
+        self.limiter.release(key, self._response(**{
+            'X-RateLimit-Remaining': '5',
+            'X-RateLimit-Reset': str(int(time.time()) + 7200)}))
+        self.limiter.acquire(key)  # A new window began
+
+
+class _RateLimitedHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    ''' Always answers 429, asking to retry in 2 seconds. '''
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.hits += 1
+        self.send_response(429)
+        self.send_header('Retry-After', '2')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestRateLimitsWithSession(TestCase):
+    ''' `request` through a real `create_session` adapter. '''
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0),
+                                                _RateLimitedHandler)
+        self.server.hits = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        patcher = patch('issue2branch.utils.requests._RATE_LIMITER',
+                        RateLimiter(max_wait=1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch('sys.stderr')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_after_is_left_to_the_rate_limiter(self):
+        url = "http://127.0.0.1:{}/issues".format(self.server.server_port)
+        session = create_session()
+        self.assertRaises(RateLimited, request, session.get, url)
+        eq_(self.server.hits, 1)
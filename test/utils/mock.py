@@ -22,3 +22,4 @@ patch = mock.patch
 sentinel = mock.sentinel
 Mock = mock.Mock
 MagicMock = mock.MagicMock
+PropertyMock = mock.PropertyMock